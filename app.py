@@ -4,11 +4,53 @@ from PIL import Image, ImageFile
 import threading
 import time
 from datetime import datetime
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 import multiprocessing
 import struct
 import random
+import math
+from statistics import NormalDist, median
 import mmap
+import json
+import uuid
+import argparse
+import socket
+import select
+import ctypes
+import ctypes.util
+import urllib.request
+import urllib.error
+import io
+import zipfile
+import tarfile
+try:
+    import numpy as np
+except ImportError:  # Size prefilter is unavailable without NumPy
+    np = None
+# Optional faster decoder backends; Pillow is used for whatever they cannot handle
+try:
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+try:
+    import turbojpeg
+except ImportError:
+    turbojpeg = None
+try:
+    import cv2
+    # Decode failures are reported as verdicts, not as log lines on stderr
+    cv2.utils.logging.setLogLevel(cv2.utils.logging.LOG_LEVEL_SILENT)
+except ImportError:
+    cv2 = None
+import cProfile
+import pstats
+import heapq
+import hashlib
+import sqlite3
+import queue
+import zlib
+from collections import deque, namedtuple
+from contextlib import contextmanager
 
 # Enable loading of truncated images for better detection
 ImageFile.LOAD_TRUNCATED_IMAGES = True
@@ -27,66 +69,914 @@ processing_status = {
     'message': '',
     'start_time': None,
     'images_per_second': 0,
-    'max_processes': multiprocessing.cpu_count()  # Default to CPU count
+    'max_processes': multiprocessing.cpu_count(),  # Default to CPU count
+    'slowest_images': []
 }
 
-def quick_file_check(file_path):
+# Supported image extensions and the Pillow format each one should contain
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.ico'}
+EXTENSION_FORMATS = {
+    '.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.gif': 'GIF',
+    '.bmp': 'BMP', '.tiff': 'TIFF', '.webp': 'WEBP', '.ico': 'ICO',
+}
+# Pillow formats that are variants of an extension's format, e.g. multi-picture JPEGs
+FORMAT_VARIANTS = {'MPO': 'JPEG'}
+
+# Archives whose image members can be scanned in place; members are reported as archive!member
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+ARCHIVE_SEPARATOR = '!'
+ARCHIVE_MEMBERS_PER_UNIT = 50
+
+# Multi-frame validation: frames checked per worker unit before the rest is split off
+FRAMES_PER_UNIT = 32
+
+# Device-aware scheduling: units in flight on a spinning disk without an explicit limit;
+# two keeps the disk busy while a worker decodes, without seeking between many files
+ROTATIONAL_DEFAULT_PROCESSES = 2
+
+# TIFF tags locating each page's pixel data, for structural checks without decoding
+TIFF_STRIP_OFFSETS, TIFF_STRIP_BYTE_COUNTS = 273, 279
+TIFF_TILE_OFFSETS, TIFF_TILE_BYTE_COUNTS = 324, 325
+
+# Header bytes read for validation and format sniffing (WebP needs 16)
+HEADER_BYTES = 16
+
+# Memory-bounded decode: images above this many pixels are validated incrementally
+# (reduced-scale JPEG, streamed PNG/TIFF data) instead of being loaded whole
+LARGE_IMAGE_PIXELS = 50_000_000
+BOUNDED_CHUNK_BYTES = 1024 * 1024
+TIFF_COMPRESSION = 259
+TIFF_DEFLATE_CODES = (8, 32946)
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+PNG_ADAM7_PASSES = ((0, 0, 8, 8), (4, 0, 8, 8), (0, 4, 4, 8), (2, 0, 4, 4), (0, 2, 2, 4), (1, 0, 2, 2), (0, 1, 1, 2))
+
+# Decoder backends tried per format in 'auto' mode, fastest first; Pillow is always the fallback
+DECODER_PREFERENCES = {
+    'JPEG': ('simplejpeg', 'turbojpeg', 'opencv'),
+    'PNG': ('opencv',),
+    'WEBP': ('opencv',),
+    'BMP': ('opencv',),
+}
+
+# Idle-priority workers: ioprio_set(2) syscall numbers and constants, and the Windows equivalent
+IOPRIO_SET_SYSCALLS = {'x86_64': 251, 'i686': 289, 'aarch64': 30, 'armv7l': 314}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+PROCESS_MODE_BACKGROUND_BEGIN = 0x00100000
+
+# Likely-corrupt-first ordering: signal weights and thresholds
+TINY_FILE_BYTES = 1024
+RECENT_MTIME_SECONDS = 24 * 60 * 60
+SIZE_OUTLIER_FACTOR = 10
+PRIORITY_WEIGHTS = {'quick_check_failed': 8, 'tiny': 4, 'size_outlier': 2, 'recent': 1}
+
+# Budgeted runs: batches are probes of this size until a per-image cost is known, and
+# never hold more than this fraction of the remaining budget, or these seconds, for one worker
+PROBE_BATCH_SIZE = 5
+BUDGET_BATCH_FRACTION = 0.1
+BUDGET_BATCH_SECONDS = 2.0
+
+# Robust z-score (median/MAD of log10 size) above which a file is a size outlier
+SIZE_OUTLIER_Z = 3.5
+SIZE_MAD_FLOOR = 0.05  # log10 units, roughly a 12% size spread
+
+# Number of slowest images kept per job for the status API and result file
+SLOWEST_IMAGES_LIMIT = 20
+
+# Manifest mode: checksum algorithm by hex digest length, hashing read size, and our own manifest header
+MANIFEST_ALGORITHMS = {32: 'md5', 40: 'sha1', 64: 'sha256', 128: 'sha512'}
+HASH_CHUNK_BYTES = 4 * 1024 * 1024
+MANIFEST_HEADER = '# corrupt-image-manifest'
+
+# Dry-run planner: /start_processing options of each check level it times, how long
+# sampling may take, and the fixed cost of starting a worker pool
+PLAN_CHECK_LEVELS = {
+    'deep': {},
+    'reduced': {'reduced_decode': True},
+    'fast_decoder': {'decoder': 'auto'},
+    'all_frames': {'multi_frame': 'decode'},
+}
+PLAN_SAMPLE_SECONDS = 30
+PLAN_POOL_STARTUP_SECONDS = 1.0
+
+# Live throughput: per-second samples kept for graphing, and the EWMA time constant in seconds
+THROUGHPUT_SAMPLES = 300
+THROUGHPUT_EWMA_SECONDS = 10
+COMPACT_THROUGHPUT_SAMPLES = 120  # Sent by /get_status?compact=1, as many as the UI graphs
+
+# Scan history: verdict rows are bulk-inserted by a background writer in batches of this size
+HISTORY_BATCH_ROWS = 5000
+
+# File size buckets used to label stage timings (upper bound in bytes, label)
+SIZE_BUCKETS = [
+    (100 * 1024, '<100KB'),
+    (1024 * 1024, '100KB-1MB'),
+    (10 * 1024 * 1024, '1MB-10MB'),
+    (100 * 1024 * 1024, '10MB-100MB'),
+    (float('inf'), '>=100MB'),
+]
+
+# Histogram bucket upper bounds for stage durations, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# Process-lifetime metrics exposed on /metrics (guarded by metrics_lock)
+metrics_lock = threading.Lock()
+metrics = {
+    'stage_histograms': {},  # (stage, format, size_bucket) -> [bucket counts..., sum, count]
+    'bytes_read': 0,
+    'images_checked': 0,
+    'corrupt_found': 0,
+    'queue_depth': 0,
+    'active_workers': 0,
+    'cache_hits': 0,  # Verdicts reused from a duplicate's representative
+}
+
+def size_bucket_label(size):
+    """Map a file size in bytes to its histogram size bucket label"""
+    for upper, label in SIZE_BUCKETS:
+        if size < upper:
+            return label
+    return SIZE_BUCKETS[-1][1]
+
+class StageTimer:
+    """Low-overhead wall clock timer for the stages of one image check"""
+
+    def __init__(self):
+        self.stages = {}
+        self.format = None
+        self.size = 0
+        self.dimensions = None
+        self.n_frames = 1
+        self.frames_checked = 0
+        self.problem = None
+        self.bounded = False
+        self.decoder = 'pillow'  # Backend whose result is the verdict
+        self._started = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        """Attribute the time since the previous mark to the given stage"""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def elapsed(self):
+        """Total wall time since the timer was created"""
+        return time.perf_counter() - self._started
+
+    def skip(self):
+        """Reset the clock without attributing the elapsed time to any stage"""
+        self._last = time.perf_counter()
+
+def new_batch_stats():
+    """Create an empty per-batch stats accumulator"""
+    return {'histograms': {}, 'bytes_read': 0, 'images': 0, 'corrupt': 0}
+
+def observe_timer(stats, timer, fallback_format):
+    """Fold one image's stage timings into a batch stats accumulator"""
+    fmt = (timer.format or fallback_format or 'unknown').lower()
+    bucket = size_bucket_label(timer.size)
+    histograms = stats['histograms']
+    for stage, seconds in timer.stages.items():
+        key = (stage, fmt, bucket)
+        hist = histograms.get(key)
+        if hist is None:
+            hist = histograms[key] = [0] * len(LATENCY_BUCKETS) + [0.0, 0]
+        for i, upper in enumerate(LATENCY_BUCKETS):
+            if seconds <= upper:
+                hist[i] += 1
+                break
+        hist[-2] += seconds
+        hist[-1] += 1
+    stats['bytes_read'] += timer.size
+    stats['images'] += 1
+
+def merge_batch_stats(stats):
+    """Merge stats returned by a worker batch into the global metrics"""
+    with metrics_lock:
+        histograms = metrics['stage_histograms']
+        for key, hist in stats['histograms'].items():
+            total = histograms.get(key)
+            if total is None:
+                histograms[key] = list(hist)
+            else:
+                for i, value in enumerate(hist):
+                    total[i] += value
+        metrics['bytes_read'] += stats['bytes_read']
+        metrics['images_checked'] += stats['images']
+        metrics['corrupt_found'] += stats['corrupt']
+
+def sniff_image_format(header):
+    """Detect the real image format from magic bytes, or None if unrecognized"""
+    if header[:2] == b'\xff\xd8':
+        return 'JPEG'
+    if header[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'PNG'
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return 'GIF'
+    if header[:4] in (b'II*\x00', b'MM\x00*', b'II+\x00', b'MM\x00+'):
+        return 'TIFF'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    if header[:2] == b'BM':
+        return 'BMP'
+    if header[:4] == b'\x00\x00\x01\x00':
+        return 'ICO'
+    return None
+
+def rewind(image_source):
+    """Seek an in-memory image buffer back to the start; paths are left alone"""
+    if isinstance(image_source, io.BytesIO):
+        image_source.seek(0)
+
+def quick_file_check(file_path, size=None):
     """Ultra-fast preliminary file checks"""
+    throttle_io(HEADER_BYTES, 1)
+    return quick_header_check(file_path, size)[0]
+
+def quick_header_check(file_path, size=None):
+    """Preliminary file checks that also return the header bytes read
+    
+    Returns (is_corrupt, header); header is None if the file could not be read.
+    """
     try:
         # Check file size
-        size = os.path.getsize(file_path)
+        if size is None:
+            size = os.path.getsize(file_path)
         if size == 0:
-            return True  # Empty file is corrupt
+            return True, b''  # Empty file is corrupt
         
-        # Check file extension vs actual format
         with open(file_path, 'rb') as f:
-            header = f.read(12)
+            return quick_stream_check(f, size)
+        
+    except (OSError, IOError, PermissionError):
+        return False, None  # Don't mark as corrupt if we can't access file
+
+def quick_stream_check(f, size):
+    """Header/trailer checks on an open binary stream of known size"""
+    if size == 0:
+        return True, b''  # Empty file is corrupt
+    
+    # Check file extension vs actual format
+    f.seek(0)
+    header = f.read(HEADER_BYTES)
+        
+    # Quick header validation for common formats
+    if len(header) < 4:
+        return True, header
+        
+    # JPEG header check
+    if header[:2] == b'\xff\xd8':
+        if size < 100:  # Too small for valid JPEG
+            return True, header
+        # Check if JPEG ends properly
+        f.seek(-2, 2)
+        end_bytes = f.read(2)
+        if end_bytes != b'\xff\xd9':
+            return True, header  # JPEG doesn't end properly
+                
+    # PNG header check
+    elif header[:8] == b'\x89PNG\r\n\x1a\n':
+        if size < 50:  # Too small for valid PNG
+            return True, header
             
-        # Quick header validation for common formats
-        if len(header) < 4:
-            return True
+    # GIF header check
+    elif header[:6] in [b'GIF87a', b'GIF89a']:
+        if size < 20:  # Too small for valid GIF
+            return True, header
             
-        # JPEG header check
-        if header[:2] == b'\xff\xd8':
-            if size < 100:  # Too small for valid JPEG
-                return True
-            # Check if JPEG ends properly
-            with open(file_path, 'rb') as f:
-                f.seek(-2, 2)
-                end_bytes = f.read(2)
-                if end_bytes != b'\xff\xd9':
-                    return True  # JPEG doesn't end properly
-                    
-        # PNG header check
-        elif header[:8] == b'\x89PNG\r\n\x1a\n':
-            if size < 50:  # Too small for valid PNG
-                return True
-                
-        # GIF header check
-        elif header[:6] in [b'GIF87a', b'GIF89a']:
-            if size < 20:  # Too small for valid GIF
-                return True
-                
-        return False  # Passed quick checks
+    return False, header  # Passed quick checks
+
+def tiff_strip_table(img):
+    """(offsets, byte_counts) of the current TIFF page's strips or tiles, or None"""
+    tags = img.tag_v2
+    if TIFF_STRIP_OFFSETS in tags:
+        offsets, counts = tags.get(TIFF_STRIP_OFFSETS), tags.get(TIFF_STRIP_BYTE_COUNTS)
+    elif TIFF_TILE_OFFSETS in tags:
+        offsets, counts = tags.get(TIFF_TILE_OFFSETS), tags.get(TIFF_TILE_BYTE_COUNTS)
+    else:
+        return None
+    if counts is None:
+        return None
+    if isinstance(offsets, int):
+        offsets = (offsets,)
+    if isinstance(counts, int):
+        counts = (counts,)
+    return offsets, counts
+
+def tiff_frame_problem(img, file_size):
+    """Check the current TIFF page's strip/tile table against the file size
+    
+    Returns a problem description, '' if the page looks sound, or None if the
+    page has no offset table and has to be decoded instead.
+    """
+    table = tiff_strip_table(img)
+    if table is None:
+        return None
+    offsets, counts = table
+    if len(offsets) != len(counts):
+        return 'strip/tile table length mismatch'
+    for offset, count in zip(offsets, counts):
+        if count <= 0:
+            return 'empty strip/tile'
+        if offset + count > file_size:
+            return 'pixel data extends past end of file'
+    return ''
+
+def check_frames(img, start, stop, file_size, multi_frame):
+    """Validate frames [start, stop) of an open image; returns (frames_checked, problem)
+    
+    TIFF pages are checked structurally from their offset tables when possible
+    (or fully decoded with multi_frame='decode'); GIF/WebP frames are decoded.
+    """
+    checked = 0
+    for index in range(start, stop):
+        try:
+            img.seek(index)
+            problem = None
+            if img.format == 'TIFF' and multi_frame != 'decode':
+                problem = tiff_frame_problem(img, file_size)
+            if problem is None:
+                img.load()
+            elif problem:
+                return checked, f'frame {index}: {problem}'
+        except EOFError:
+            return checked, f'frame {index}: missing'
+        except Exception as e:
+            return checked, f'frame {index}: {str(e)}'
+        checked += 1
+    return checked, None
+
+class IOThrottle:
+    """Token buckets on bytes read and file opens, shared by the job's processes
+    
+    Rates live in shared memory so /set_io_limits can change them mid-job; a
+    rate of 0 means unlimited and bursts are capped at one second's worth.
+    A caller takes the bucket into debt and sleeps it off outside the lock, so
+    a file larger than the burst still gets through.
+    """
+
+    def __init__(self, bytes_per_second=0, opens_per_second=0):
+        self.lock = multiprocessing.Lock()
+        self.rates = multiprocessing.RawArray('d', [bytes_per_second, opens_per_second])
+        self.tokens = multiprocessing.RawArray('d', [bytes_per_second, opens_per_second])
+        self.updated = multiprocessing.RawValue('d', time.monotonic())
+
+    def acquire(self, nbytes=0, opens=0):
+        """Charge a read of nbytes and the given number of opens, sleeping as needed"""
+        if self.rates[0] <= 0 and self.rates[1] <= 0:
+            return
+        wait = 0.0
+        with self.lock:
+            now = time.monotonic()
+            elapsed = now - self.updated.value
+            self.updated.value = now
+            for i, amount in enumerate((nbytes, opens)):
+                rate = self.rates[i]
+                if rate <= 0:
+                    continue
+                self.tokens[i] = min(rate, self.tokens[i] + elapsed * rate) - amount
+                if self.tokens[i] < 0:
+                    wait = max(wait, -self.tokens[i] / rate)
+        if wait:
+            time.sleep(wait)
+
+    def set_rates(self, bytes_per_second, opens_per_second):
+        """Change the limits of a running job (0 = unlimited)"""
+        with self.lock:
+            for i, rate in enumerate((bytes_per_second, opens_per_second)):
+                self.rates[i] = rate
+                self.tokens[i] = min(self.tokens[i], rate)
+
+    def limits(self):
+        """Current limits in the units the API uses"""
+        return {
+            'max_mb_per_second': round(self.rates[0] / (1024 * 1024), 3) or None,
+            'max_opens_per_second': round(self.rates[1], 3) or None,
+        }
+
+def throttle_io(nbytes=0, opens=0):
+    """Charge a read against the job's I/O throttle, if one is installed"""
+    if io_throttle is not None:
+        io_throttle.acquire(nbytes, opens)
+
+def lower_process_priority():
+    """Run the current process at idle CPU and I/O priority (best effort)"""
+    if os.name == 'nt':
+        # Background mode lowers CPU, I/O and memory priority together
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), PROCESS_MODE_BACKGROUND_BEGIN)
+        return
+    try:
+        os.nice(19)
+    except OSError:
+        pass
+    syscall_number = IOPRIO_SET_SYSCALLS.get(os.uname().machine)
+    if syscall_number is not None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if libc.syscall(syscall_number, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) != 0:
+            print(f"Could not set idle I/O priority: {os.strerror(ctypes.get_errno())}")
+
+# Pool-wide decode memory budget and I/O throttle, installed in each worker by init_worker
+memory_gate = None
+io_throttle = None
+
+def init_worker(gate, throttle, low_priority):
+    """Pool initializer: share the job's memory budget and I/O throttle with this worker"""
+    global memory_gate, io_throttle
+    memory_gate = gate
+    io_throttle = throttle
+    if low_priority:
+        lower_process_priority()
+
+def create_executor(options, workers):
+    """Worker pool for the job's engine
+    
+    'process' (default) and 'hybrid' use worker processes (hybrid workers also
+    split each batch across batch_threads threads); 'thread' runs the same
+    worker functions on threads of this process, avoiding spawn and pickling
+    costs since Pillow releases the GIL while decoding.
+    """
+    if options.get('engine') == 'thread':
+        return thread_engine_executor(options, workers)
+    return ProcessPoolExecutor(max_workers=workers, **worker_pool_args(options))
+
+@contextmanager
+def thread_engine_executor(options, workers):
+    """Thread pool for one job, with the job's memory gate installed only while it runs
+    
+    There is no pool initializer: it would run in the server process itself.
+    The I/O throttle is already the job's own (see begin_job and finish_job).
+    """
+    global memory_gate
+    memory_gate = job_memory_gate(options)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            yield executor
+    finally:
+        memory_gate = None
+
+def job_memory_gate(options):
+    """Shared (bytes in use, condition, budget) for the job's decode memory budget, or None"""
+    if not options.get('memory_budget_mb'):
+        return None
+    return (multiprocessing.RawValue('q', 0), multiprocessing.Condition(), options['memory_budget_mb'] * 1024 * 1024)
+
+def worker_pool_args(options):
+    """ProcessPoolExecutor keyword arguments installing the job's shared worker state"""
+    return {
+        'initializer': init_worker,
+        'initargs': (job_memory_gate(options), io_throttle, options.get('low_priority', False)),
+    }
+
+@contextmanager
+def reserve_decode_memory(nbytes):
+    """Hold nbytes of the pool-wide decode budget while decoding one large image
+    
+    An image estimated above the whole budget still runs, but only once no other
+    worker holds a reservation.
+    """
+    if memory_gate is None:
+        yield
+        return
+    in_use, condition, budget = memory_gate
+    with condition:
+        while in_use.value and in_use.value + nbytes > budget:
+            condition.wait()
+        in_use.value += nbytes
+    try:
+        yield
+    finally:
+        with condition:
+            in_use.value -= nbytes
+            condition.notify_all()
+
+def open_scan_image(image_path, formats=None):
+    """Image.open that lets images over Pillow's decompression-bomb limit through to the bounded decoder
+    
+    Pillow's global limit stays in place. Only an image it refuses is opened
+    through its format plugin directly, skipping the size check for that one
+    image; the scanner then validates it incrementally (Step 2b), under the
+    memory gate.
+    """
+    try:
+        return Image.open(image_path, formats=formats)
+    except Image.DecompressionBombError:
+        if not formats:
+            rewind(image_path)
+            if isinstance(image_path, io.BytesIO):
+                header = image_path.read(HEADER_BYTES)
+            else:
+                with open(image_path, 'rb') as f:
+                    header = f.read(HEADER_BYTES)
+            detected = sniff_image_format(header)
+            if detected is None:
+                raise
+            formats = [detected]
+        Image.init()
+        rewind(image_path)
+        factory = Image.OPEN[formats[0]][0]
+        # A path makes the plugin own (and close) the file, like Image.open does
+        return factory(image_path) if isinstance(image_path, str) else factory(image_path, None)
+
+def bounded_decode_estimate(img):
+    """Rough peak memory in bytes of validating an image with bounded_decode_problem"""
+    width, height = img.size
+    bands = len(img.getbands())
+    if img.format == 'JPEG':
+        if img.info.get('progressive'):
+            return width * height * bands * 2  # libjpeg buffers every DCT coefficient
+        return (width // 8 + 1) * (height // 8 + 1) * bands
+    if img.format in ('PNG', 'TIFF'):
+        return 4 * BOUNDED_CHUNK_BYTES
+    return width * height * bands  # Other formats are decoded whole
+
+def png_data_length(width, height, bits_per_pixel, interlace):
+    """Expected size of a PNG's inflated image data, filter bytes included"""
+    passes = PNG_ADAM7_PASSES if interlace else ((0, 0, 1, 1),)
+    total = 0
+    for x0, y0, dx, dy in passes:
+        columns = (width - x0 + dx - 1) // dx if width > x0 else 0
+        rows = (height - y0 + dy - 1) // dy if height > y0 else 0
+        if columns and rows:
+            total += rows * (1 + (columns * bits_per_pixel + 7) // 8)
+    return total
+
+def png_stream_problem(f):
+    """Walk a PNG's chunks checking CRCs and inflate its image data in bounded memory
+    
+    Returns a problem description, or '' if the image data is complete.
+    """
+    f.seek(8)
+    inflater = zlib.decompressobj()
+    expected = None
+    inflated = 0
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            return 'missing IEND chunk'
+        length, chunk_type = struct.unpack('>I4s', head)
+        name = chunk_type.decode('latin-1')
+        if length > 0x7FFFFFFF:
+            return f'invalid {name} chunk length'
+        if chunk_type == b'IDAT' and expected is None:
+            return 'image data before IHDR'
         
-    except (OSError, IOError, PermissionError):
-        return False  # Don't mark as corrupt if we can't access file
+        # Stream the chunk body so neither metadata nor pixel data is held whole
+        crc = zlib.crc32(chunk_type)
+        first = b''
+        remaining = length
+        while remaining:
+            piece = f.read(min(remaining, BOUNDED_CHUNK_BYTES))
+            if not piece:
+                return f'truncated {name} chunk'
+            remaining -= len(piece)
+            crc = zlib.crc32(piece, crc)
+            first = first or piece
+            if chunk_type == b'IDAT':
+                try:
+                    while piece:
+                        inflated += len(inflater.decompress(piece, BOUNDED_CHUNK_BYTES))
+                        piece = inflater.unconsumed_tail
+                except zlib.error as e:
+                    return f'invalid image data: {str(e)}'
+        stored = f.read(4)
+        if len(stored) < 4 or struct.unpack('>I', stored)[0] != crc:
+            return f'bad {name} chunk CRC'
+        
+        if chunk_type == b'IHDR':
+            if len(first) < 13:
+                return 'invalid IHDR chunk'
+            width, height, depth, color, _, _, interlace = struct.unpack('>IIBBBBB', first[:13])
+            expected = png_data_length(width, height, depth * PNG_CHANNELS.get(color, 4), interlace)
+        elif chunk_type == b'IEND':
+            break
+    
+    inflated += len(inflater.flush())
+    if not inflater.eof:
+        return 'incomplete image data'
+    if inflated != expected:
+        return 'image data length mismatch'
+    return ''
+
+def tiff_stream_problem(img, f, file_size):
+    """Read the current TIFF page's strips/tiles in bounded chunks, inflating Deflate data
+    
+    Returns a problem description, '' if the page reads cleanly, or None if the
+    page has no offset table.
+    """
+    problem = tiff_frame_problem(img, file_size)
+    if problem is None or problem:
+        return problem
+    deflate = img.tag_v2.get(TIFF_COMPRESSION, 1) in TIFF_DEFLATE_CODES
+    for offset, count in zip(*tiff_strip_table(img)):
+        f.seek(offset)
+        inflater = zlib.decompressobj() if deflate else None
+        remaining = count
+        while remaining:
+            piece = f.read(min(remaining, BOUNDED_CHUNK_BYTES))
+            if not piece:
+                return 'pixel data extends past end of file'
+            remaining -= len(piece)
+            if inflater is not None:
+                try:
+                    while piece:
+                        inflater.decompress(piece, BOUNDED_CHUNK_BYTES)
+                        piece = inflater.unconsumed_tail
+                except zlib.error as e:
+                    return f'invalid strip data at offset {offset}: {str(e)}'
+        if inflater is not None:
+            inflater.flush()
+            if not inflater.eof:
+                return f'incomplete strip data at offset {offset}'
+    return ''
+
+def bounded_decode_problem(image_source, img, file_size):
+    """Validate a gigapixel image without materializing its full-resolution pixels
+    
+    JPEGs are decoded at 1/8 scale (every entropy-coded block is still parsed),
+    PNG and TIFF data is streamed and inflated chunk by chunk, and other formats
+    fall back to a full decode. The work is held against the pool-wide memory
+    budget. Returns a problem description or ''.
+    """
+    with reserve_decode_memory(bounded_decode_estimate(img)):
+        if img.format == 'JPEG':
+            img.draft(img.mode, (img.width // 8, img.height // 8))
+            img.load()
+            return ''
+        if img.format in ('PNG', 'TIFF'):
+            f = image_source if isinstance(image_source, io.BytesIO) else open(image_source, 'rb')
+            try:
+                if img.format == 'PNG':
+                    return png_stream_problem(f)
+                problem = tiff_stream_problem(img, f, file_size)
+            finally:
+                if f is not image_source:
+                    f.close()
+            if problem is not None:
+                return problem
+        img.load()
+        return ''
+
+def check_remaining_frames(img, timer, multi_frame, defer_frames=False):
+    """Step 4b: validate frames after the first; returns True if one is corrupt
+    
+    With defer_frames, frames past FRAMES_PER_UNIT are left for other workers.
+    """
+    timer.frames_checked = 1
+    if multi_frame:
+        try:
+            timer.n_frames = getattr(img, 'n_frames', 1)
+        except Exception as e:
+            # Counting frames walks every frame header (e.g. the TIFF IFD chain)
+            timer.problem = f'frame table unreadable: {str(e)}'
+            return True
+    if timer.n_frames > 1:
+        stop = min(timer.n_frames, FRAMES_PER_UNIT) if defer_frames else timer.n_frames
+        checked, problem = check_frames(img, 1, stop, timer.size, multi_frame)
+        timer.frames_checked += checked
+        timer.mark('frames')
+        if problem:
+            timer.problem = problem
+            return True
+    return False
+
+# Common verdict type for every decoder backend
+DecodeVerdict = namedtuple('DecodeVerdict', ['corrupt', 'reason', 'backend'])
+
+def decode_simplejpeg(data, reduced):
+    """libjpeg-turbo via simplejpeg; strict mode raises on recoverable errors too"""
+    simplejpeg.decode_jpeg(data, fastdct=True, fastupsample=True, min_factor=8 if reduced else 1, strict=True)
+
+turbojpeg_decoder = None
+
+def decode_turbojpeg(data, reduced):
+    """libjpeg-turbo via PyTurboJPEG, stopping on the first warning"""
+    global turbojpeg_decoder
+    if turbojpeg_decoder is None:
+        turbojpeg_decoder = turbojpeg.TurboJPEG()
+    turbojpeg_decoder.decode(data, scaling_factor=(1, 8) if reduced else None,
+                             flags=turbojpeg.TJFLAG_FASTDCT | turbojpeg.TJFLAG_STOPONWARNING)
+
+def decode_opencv(data, reduced):
+    """OpenCV's imdecode; it reports failure by returning None"""
+    flags = cv2.IMREAD_REDUCED_COLOR_8 if reduced else cv2.IMREAD_COLOR
+    if cv2.imdecode(np.frombuffer(data, np.uint8), flags) is None:
+        raise ValueError('imdecode could not decode the image')
+
+def decode_pillow(data, reduced):
+    """Pillow, with JPEG draft mode for reduced-scale decodes"""
+    with Image.open(io.BytesIO(data)) as img:
+        if reduced and img.format == 'JPEG':
+            img.draft(img.mode, (img.width // 8, img.height // 8))
+        img.load()
+
+DECODER_BACKENDS = {
+    'simplejpeg': decode_simplejpeg,
+    'turbojpeg': decode_turbojpeg,
+    'opencv': decode_opencv,
+    'pillow': decode_pillow,
+}
+
+def decoder_available(name):
+    """True if a backend's library is installed and loads in this process"""
+    global turbojpeg_decoder
+    if name == 'pillow':
+        return True
+    if name == 'simplejpeg':
+        return simplejpeg is not None
+    if name == 'opencv':
+        return cv2 is not None and np is not None
+    if name == 'turbojpeg' and turbojpeg is not None:
+        try:
+            if turbojpeg_decoder is None:
+                turbojpeg_decoder = turbojpeg.TurboJPEG()
+            return True
+        except (OSError, RuntimeError):
+            return False  # Python bindings without the libturbojpeg shared library
+    return False
+
+def resolve_decoders(decoder, reduced=False):
+    """Map image formats to the decode backend used in place of Pillow's full checks
+    
+    decoder is 'pillow' (no mapping), 'auto' (fastest installed backend per
+    format) or a backend name (used for every format it appears under). With
+    reduced, JPEGs no other backend takes get Pillow's 1/8-scale draft decode.
+    """
+    decoders = {}
+    if decoder != 'pillow':
+        for image_format, names in DECODER_PREFERENCES.items():
+            for name in names:
+                if (decoder == 'auto' or decoder == name) and decoder_available(name):
+                    decoders[image_format] = name
+                    break
+    if reduced and decoder in ('pillow', 'auto'):
+        decoders.setdefault('JPEG', 'pillow')
+    return decoders
+
+def run_decoder(name, data, reduced=False):
+    """Decode with one backend and map its error reporting to a DecodeVerdict"""
+    try:
+        DECODER_BACKENDS[name](data, reduced)
+    except MemoryError:
+        raise
+    except Exception as e:
+        return DecodeVerdict(True, f'{name}: {str(e) or type(e).__name__}', name)
+    return DecodeVerdict(False, None, name)
+
+def load_benchmark_corpus(folder_path, limit=None):
+    """Read up to `limit` images under a folder into memory as (path, format, data)"""
+    corpus = []
+    for dirpath, _, filenames in os.walk(folder_path):
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, 'rb') as f:
+                data = f.read()
+            corpus.append((path, sniff_image_format(data[:HEADER_BYTES]), data))
+            if limit and len(corpus) >= limit:
+                return corpus
+    return corpus
+
+def benchmark_decoders(corpus, backends=None, reduced=False):
+    """Check the same in-memory corpus with each backend and compare speed and verdicts
+    
+    Every image goes through deep_corruption_check, as in a scan. Each backend
+    gets the images of the formats it is used for, and its row compares it with
+    the Pillow-only check of exactly those images; disagreements are counted
+    against Pillow's verdicts. With reduced, the Pillow row times its draft
+    decode of JPEGs against that same full check.
+    """
+    names = backends or [name for name in DECODER_BACKENDS if decoder_available(name)]
+    
+    def check(data, decoders):
+        started = time.perf_counter()
+        corrupt = deep_corruption_check(io.BytesIO(data), decoders=decoders, reduced_decode=reduced)
+        return corrupt, time.perf_counter() - started
+    
+    baseline = {path: check(data, {}) for path, _, data in corpus}
+    results = []
+    for name in names:
+        decoders = resolve_decoders(name, reduced)
+        items = [item for item in corpus if name == 'pillow' or item[1] in decoders]
+        corrupt = disagreements = nbytes = 0
+        seconds = pillow_seconds = 0.0
+        for path, _, data in items:
+            pillow_corrupt, pillow_elapsed = baseline[path]
+            verdict, elapsed = check(data, decoders) if decoders else (pillow_corrupt, pillow_elapsed)
+            corrupt += verdict
+            disagreements += verdict != pillow_corrupt
+            nbytes += len(data)
+            seconds += elapsed
+            pillow_seconds += pillow_elapsed
+        results.append({
+            'backend': name,
+            'images': len(items),
+            'seconds': round(seconds, 4),
+            'pillow_seconds': round(pillow_seconds, 4),
+            'speedup': round(pillow_seconds / seconds, 2) if seconds else 0.0,
+            'images_per_second': round(len(items) / seconds, 1) if seconds else 0.0,
+            'mb_per_second': round(nbytes / (1024 * 1024) / seconds, 1) if seconds else 0.0,
+            'corrupt': corrupt,
+            'disagreements': disagreements,
+        })
+    return results
+
+def benchmark_engines(corpus, engines, workers, threads=4, decoder='pillow', min_images=20):
+    """Run the full-scan worker on the corpus files with each engine, per workload
+    
+    A workload is the images of one format and size bucket (at least
+    min_images of them); pool start-up is included, as it is in a real scan.
+    Returns result dicts with the fastest engine of each workload marked.
+    """
+    workloads = {}
+    for path, image_format, data in corpus:
+        key = f"{(image_format or 'unknown').lower()} {size_bucket_label(len(data))}"
+        workloads.setdefault(key, []).append((path, os.path.basename(os.path.dirname(path)), os.path.basename(path)))
+    workloads = {key: tasks for key, tasks in workloads.items() if len(tasks) >= min_images}
+    if len(workloads) > 1:
+        workloads['all'] = [task for tasks in workloads.values() for task in tasks]
+    
+    results = []
+    for workload, tasks in sorted(workloads.items()):
+        batch_size = max(5, len(tasks) // (workers * 4))
+        batches = list(create_image_batches(tasks, batch_size))
+        rows = []
+        for engine in engines:
+            options = {'slowest_limit': 0, 'engine': engine, 'decoder': decoder}
+            if engine == 'hybrid':
+                options['batch_threads'] = threads
+            started = time.perf_counter()
+            with create_executor(options, workers) as executor:
+                batch_results = list(executor.map(process_single_image_batch, batches, [options] * len(batches)))
+            seconds = time.perf_counter() - started
+            rows.append({
+                'workload': workload,
+                'engine': engine,
+                'images': len(tasks),
+                'seconds': round(seconds, 4),
+                'images_per_second': round(len(tasks) / seconds, 1) if seconds else 0.0,
+                'corrupt': sum(len(result['corrupt_images']) for result in batch_results),
+                'fastest': False,
+            })
+        min(rows, key=lambda row: row['seconds'])['fastest'] = True
+        results.extend(rows)
+    return results
 
-def deep_corruption_check(image_path):
-    """Extremely accurate corruption detection with minimal resource usage"""
+def deep_corruption_check(image_path, timer=None, multi_frame=None, large_image_pixels=LARGE_IMAGE_PIXELS,
+                          decoders=None, reduced_decode=False, defer_frames=False):
+    """Extremely accurate corruption detection with minimal resource usage
+    
+    image_path may also be an in-memory buffer (io.BytesIO), e.g. an archive member.
+    decoders maps formats to a faster backend (see resolve_decoders).
+    defer_frames leaves frames past FRAMES_PER_UNIT to the caller (see plan_frame_units).
+    """
+    if timer is None:
+        timer = StageTimer()
     try:
         # Step 1: Quick file validation
-        if quick_file_check(image_path):
+        if isinstance(image_path, io.BytesIO):
+            size = image_path.getbuffer().nbytes
+            timer.size = size
+            timer.mark('stat')
+            is_corrupt, header = quick_stream_check(image_path, size)
+        else:
+            try:
+                size = os.path.getsize(image_path)
+            except OSError:
+                size = None
+            throttle_io(size or 0, 1)
+            timer.size = size or 0
+            timer.mark('stat')
+            is_corrupt, header = quick_header_check(image_path, size)
+        timer.mark('quick_check')
+        if is_corrupt:
             return True
+        
+        # Sniff the real format so Pillow skips probing every plugin;
+        # an unrecognized signature is reported without decoding at all
+        open_formats = None
+        if header is not None:
+            detected = sniff_image_format(header)
+            if detected is None:
+                timer.format = 'UNKNOWN'
+                return True
+            timer.format = detected
+            open_formats = [detected]
             
         # Step 2: PIL opening and basic validation
-        with Image.open(image_path) as img:
+        rewind(image_path)
+        with open_scan_image(image_path, open_formats) as img:
+            timer.format = img.format
+            timer.mark('open')
             # Validate basic properties
             if not hasattr(img, 'size') or not img.size or img.size[0] <= 0 or img.size[1] <= 0:
                 return True
                 
             # Store image info
             width, height = img.size
+            timer.dimensions = (width, height)
             mode = img.mode
             format_type = img.format
             
@@ -94,10 +984,48 @@ def deep_corruption_check(image_path):
             if format_type is None:
                 return True
             
+            # Step 2b: Gigapixel images are validated incrementally in bounded memory
+            # (this replaces the full load, pixel sampling and verify steps)
+            if width * height > min(large_image_pixels, Image.MAX_IMAGE_PIXELS or large_image_pixels):
+                timer.bounded = True
+                try:
+                    problem = bounded_decode_problem(image_path, img, timer.size)
+                except (OSError, IOError) as e:
+                    problem = str(e) if any(keyword in str(e).lower() for keyword in 
+                                            ['truncated', 'corrupt', 'broken', 'invalid', 'damaged']) else ''
+                timer.mark('bounded_decode')
+                if problem:
+                    timer.problem = problem
+                    return True
+                return check_remaining_frames(img, timer, multi_frame, defer_frames)
+            
+            # Step 2c: Single-frame images with a faster backend mapped (including Pillow's
+            # own draft decode under reduced_decode) are decoded by it in place of Pillow's
+            # load, sampling and verify steps. A backend failure may only be a limitation
+            # (CMYK or arithmetic-coded JPEG, 16-bit PNG), so the file then gets Pillow's
+            # checks and is flagged only if they fail
+            backend = decoders.get(format_type) if decoders else None
+            if backend is not None and not getattr(img, 'is_animated', False):
+                if isinstance(image_path, io.BytesIO):
+                    data = image_path.getvalue()
+                else:
+                    with open(image_path, 'rb') as f:
+                        data = f.read()
+                timer.mark('read')
+                verdict = run_decoder(backend, data, reduced_decode)
+                timer.mark('decode')
+                if not verdict.corrupt:
+                    timer.frames_checked = 1
+                    timer.decoder = backend
+                    return False
+                timer.problem = verdict.reason  # Kept as the reason if Pillow agrees
+            
             # Step 3: Try to load image data (lazy loading test)
             try:
                 img.load()
+                timer.mark('load')
             except (OSError, IOError) as e:
+                timer.mark('load')
                 if any(keyword in str(e).lower() for keyword in 
                        ['truncated', 'corrupt', 'broken', 'invalid', 'damaged']):
                     return True
@@ -112,6 +1040,7 @@ def deep_corruption_check(image_path):
                     test_img = img.convert('RGBA')
                 else:
                     test_img = img
+                timer.mark('convert')
                 
                 # Test critical pixels only (corners + center + random sample)
                 critical_points = [
@@ -137,18 +1066,27 @@ def deep_corruption_check(image_path):
                             return True
                     except (IndexError, ValueError, TypeError):
                         return True
+                timer.mark('sample')
                         
             except Exception as e:
                 if any(keyword in str(e).lower() for keyword in 
                        ['truncated', 'corrupt', 'broken', 'invalid', 'damaged']):
                     return True
                 return False
+            
+            # Step 4b: Remaining frames of animated GIF/WebP and multipage TIFF
+            if check_remaining_frames(img, timer, multi_frame, defer_frames):
+                return True
         
         # Step 5: Final verification (re-open for verify)
+        timer.skip()
         try:
-            with Image.open(image_path) as img:
+            rewind(image_path)
+            with Image.open(image_path, formats=open_formats) as img:
                 img.verify()
+            timer.mark('verify')
         except Exception as e:
+            timer.mark('verify')
             error_msg = str(e).lower()
             # Only mark as corrupt for specific corruption errors
             corruption_keywords = [
@@ -172,24 +1110,493 @@ def deep_corruption_check(image_path):
         ]
         return any(keyword in error_msg for keyword in corruption_keywords)
 
-def process_single_image_batch(image_batch):
-    """Process a batch of images in a single process"""
-    corrupt_images = []
+class ProfileSnapshot:
+    """Adapter that lets pstats load raw profiler stats captured in a worker"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+def track_slowest(heap, record, limit):
+    """Keep the `limit` slowest image records in a min-heap keyed by duration"""
+    if limit <= 0:
+        return
+    entry = (record['seconds'], record['path'], record)
+    if len(heap) < limit:
+        heapq.heappush(heap, entry)
+    elif entry[:2] > heap[0][:2]:
+        heapq.heapreplace(heap, entry)
+
+class BatchResults:
+    """Collects verdicts, timings and profiles for one unit of worker work"""
+
+    def __init__(self, options):
+        self.corrupt_images = []
+        self.stats = new_batch_stats()
+        self.slowest_limit = options.get('slowest_limit', SLOWEST_IMAGES_LIMIT)
+        self.slowest = []
+        self.format_mismatches = []
+        self.multi_frame = options.get('multi_frame')
+        self.frames_checked = 0
+        self.multi_frame_images = 0
+        self.deferred_frames = []
+        self.defer_frames = options.get('defer_frames', False)  # Only runners that drain extra_units
+        self.large_image_pixels = options.get('large_image_pixels', LARGE_IMAGE_PIXELS)
+        self.large_images = 0
+        self.reduced_decode = options.get('reduced_decode', False)
+        self.decoders = resolve_decoders(options.get('decoder', 'pillow'), self.reduced_decode)
+        self.members_checked = []  # Archive members, which have no accounting batch
+        
+        # Optional cProfile capture, limited to the job's profiling window
+        self.profiler = None
+        self.profile_until = options.get('profile_until')
+        if options.get('profile') and (self.profile_until is None or time.time() < self.profile_until):
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def check(self, image_source, image_path, folder_name, filename, timer=None):
+        """Check one image (a path or in-memory buffer) and record the outcome"""
+        if self.profiler is not None and self.profile_until is not None and time.time() >= self.profile_until:
+            self.profiler.disable()
+        if timer is None:
+            timer = StageTimer()
+        defer_frames = self.defer_frames and isinstance(image_source, str)
+        is_corrupt = deep_corruption_check(image_source, timer, self.multi_frame, self.large_image_pixels,
+                                           self.decoders, self.reduced_decode, defer_frames)
+        if is_corrupt:
+            self.corrupt_images.append({'folder': folder_name, 'image': filename, 'path': image_path})
+            self.stats['corrupt'] += 1
+            if timer.format == 'UNKNOWN':
+                self.corrupt_images[-1]['reason'] = 'unknown/corrupt'
+            elif timer.problem:
+                self.corrupt_images[-1]['reason'] = timer.problem
+            if self.decoders:
+                self.corrupt_images[-1]['decoder'] = timer.decoder
+        
+        if timer.bounded:
+            self.large_images += 1
+        if not isinstance(image_source, str):
+            self.members_checked.append((image_path, folder_name, filename))
+        
+        # Multi-frame bookkeeping; large documents hand their remaining frames back
+        self.frames_checked += timer.frames_checked
+        if timer.n_frames > 1:
+            self.multi_frame_images += 1
+            if not is_corrupt and timer.n_frames > FRAMES_PER_UNIT and defer_frames:
+                self.deferred_frames.append((image_path, folder_name, filename, timer.n_frames))
+        
+        # Report files whose content does not match their extension
+        file_ext = os.path.splitext(filename)[1].lower()
+        expected_format = EXTENSION_FORMATS.get(file_ext)
+        detected_format = FORMAT_VARIANTS.get(timer.format, timer.format)
+        if detected_format not in (None, 'UNKNOWN') and expected_format and detected_format != expected_format:
+            self.format_mismatches.append({
+                'folder': folder_name,
+                'image': filename,
+                'path': image_path,
+                'extension': file_ext,
+                'detected_format': timer.format,
+            })
+        file_ext = file_ext.lstrip('.')
+        observe_timer(self.stats, timer, file_ext)
+        track_slowest(self.slowest, {
+            'path': image_path,
+            'folder': folder_name,
+            'image': filename,
+            'format': (timer.format or file_ext).lower(),
+            'dimensions': list(timer.dimensions) if timer.dimensions else None,
+            'frames': timer.frames_checked,
+            'bytes': timer.size,
+            'seconds': round(timer.elapsed(), 6),
+            'corrupt': is_corrupt,
+        }, self.slowest_limit)
+        return is_corrupt
+
+    def finish(self):
+        """Stop profiling and return the picklable result dict"""
+        profile = None
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.create_stats()
+            profile = self.profiler.stats
+        
+        return {
+            'corrupt_images': self.corrupt_images,
+            'stats': self.stats,
+            'profile': profile,
+            'slowest': [entry[2] for entry in self.slowest],
+            'format_mismatches': self.format_mismatches,
+            'frames_checked': self.frames_checked,
+            'multi_frame_images': self.multi_frame_images,
+            'deferred_frames': self.deferred_frames,
+            'large_images': self.large_images,
+            'members_checked': self.members_checked,
+        }
+
+# Per-process thread pool used by the hybrid engine
+batch_thread_pool = None
+
+def merge_batch_results(parts):
+    """Combine the result dicts of sub-batches checked by separate threads"""
+    merged = parts[0]
+    profiles = [part['profile'] for part in parts if part['profile']]
+    for part in parts[1:]:
+        for key in ('corrupt_images', 'slowest', 'format_mismatches', 'deferred_frames', 'members_checked'):
+            merged[key].extend(part[key])
+        for key in ('frames_checked', 'multi_frame_images', 'large_images'):
+            merged[key] += part[key]
+        stats = merged['stats']
+        for key in ('bytes_read', 'images', 'corrupt'):
+            stats[key] += part['stats'][key]
+        for key, hist in part['stats']['histograms'].items():
+            total = stats['histograms'].setdefault(key, [0] * len(hist))
+            for i, value in enumerate(hist):
+                total[i] += value
+    if len(profiles) > 1:
+        combined = pstats.Stats(ProfileSnapshot(profiles[0]))
+        for profile in profiles[1:]:
+            combined.add(ProfileSnapshot(profile))
+        merged['profile'] = combined.stats
+    return merged
+
+def process_single_image_batch(image_batch, options=None):
+    """Process a batch of images in a single process
+    
+    With batch_threads > 1 (the hybrid engine) the batch is split across that
+    many threads of this process and their results merged.
+    """
+    options = options or {}
+    threads = min(options.get('batch_threads', 1), len(image_batch))
+    if threads > 1:
+        global batch_thread_pool
+        if batch_thread_pool is None:
+            batch_thread_pool = ThreadPoolExecutor(max_workers=options['batch_threads'])
+        single = dict(options, batch_threads=1)
+        chunks = [image_batch[i::threads] for i in range(threads)]
+        return merge_batch_results(list(batch_thread_pool.map(
+            lambda chunk: process_single_image_batch(chunk, single), chunks)))
+    
+    results = BatchResults(options)
     
     for image_path, folder_name, filename in image_batch:
-        if deep_corruption_check(image_path):
-            corrupt_images.append({'folder': folder_name, 'image': filename})
+        results.check(image_path, image_path, folder_name, filename)
+    
+    return results.finish()
+
+def process_frame_range(frame_unit, options=None):
+    """Check frames [start, stop) of one multipage/animated image split off by the coordinator"""
+    image_path, folder_name, filename, start, stop = frame_unit
+    results = BatchResults(options or {})
+    problem = None
+    throttle_io(opens=1)
+    try:
+        with open_scan_image(image_path) as img:
+            checked, problem = check_frames(img, start, stop, os.path.getsize(image_path),
+                                            results.multi_frame)
+        results.frames_checked += checked
+    except Exception as e:
+        problem = f'frames {start}-{stop - 1}: {str(e)}'
+    if problem:
+        results.corrupt_images.append({'folder': folder_name, 'image': filename,
+                                       'path': image_path, 'reason': problem})
+        results.stats['corrupt'] += 1
+    return results.finish()
+
+def plan_frame_units(deferred):
+    """Split a large document's remaining frames into work units for other workers"""
+    image_path, folder_name, filename, n_frames = deferred
+    for start in range(FRAMES_PER_UNIT, n_frames, FRAMES_PER_UNIT):
+        frame_unit = (image_path, folder_name, filename, start, min(n_frames, start + FRAMES_PER_UNIT))
+        # No accounting batch: the image itself was already counted
+        yield process_frame_range, frame_unit, []
+
+def process_archive_members(archive_unit, options=None):
+    """Check a range of image members inside a zip or tar archive without extracting it
+    
+    archive_unit is (archive_path, folder_name, kind, members) where kind is
+    'zip' (members are names), 'tar' (members are (name, data_offset, size)
+    for random access into an uncompressed tar) or 'tar-stream' (members is
+    None and the compressed tar is read front to back).
+    """
+    archive_path, folder_name, kind, members = archive_unit
+    results = BatchResults(options or {})
+    archive_name = os.path.basename(archive_path)
+    throttle_io(opens=1)
+    
+    def check_member(member_name, read_member):
+        timer = StageTimer()
+        try:
+            buffer = io.BytesIO(read_member())
+            throttle_io(buffer.getbuffer().nbytes)
+        except Exception as e:
+            # Unreadable member data (bad CRC, truncated archive) is a corrupt image
+            print(f"Error reading {archive_name}!{member_name}: {str(e)}")
+            buffer = io.BytesIO(b'')
+        timer.mark('archive_read')
+        results.check(buffer, f"{archive_path}{ARCHIVE_SEPARATOR}{member_name}",
+                      folder_name, f"{archive_name}{ARCHIVE_SEPARATOR}{member_name}", timer)
+    
+    try:
+        if kind == 'zip':
+            with zipfile.ZipFile(archive_path) as archive:
+                for name in members:
+                    check_member(name, lambda: archive.read(name))
+        elif kind == 'tar':
+            with open(archive_path, 'rb') as f:
+                for name, offset, size in members:
+                    def read_range():
+                        f.seek(offset)
+                        return f.read(size)
+                    check_member(name, read_range)
+        else:
+            with tarfile.open(archive_path, 'r|*') as archive:
+                for member in archive:
+                    if member.isfile() and os.path.splitext(member.name)[1].lower() in IMAGE_EXTENSIONS:
+                        check_member(member.name, lambda: archive.extractfile(member).read())
+    except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+        # The archive itself is damaged past the members already checked
+        print(f"Error reading archive {archive_path}: {str(e)}")
+        results.corrupt_images.append({
+            'folder': folder_name, 'image': archive_name,
+            'path': archive_path, 'reason': 'unreadable archive',
+        })
+    
+    return results.finish()
+
+def is_archive_file(filename):
+    """Whether a file name looks like a supported zip/tar archive"""
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+def plan_archive_units(archive_path, folder_name, members_per_unit, sizes=None):
+    """Split an archive's image members into work units for the pool
     
-    return corrupt_images
+    Returns (units, member_count); member_count is None for compressed tars,
+    which are checked as a single streamed unit without listing them first.
+    If a sizes dict is given, each listed member's uncompressed size is
+    recorded in it by its archive!member path.
+    """
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            infos = [info for info in archive.infolist()
+                     if not info.is_dir() and os.path.splitext(info.filename)[1].lower() in IMAGE_EXTENSIONS]
+        names = [info.filename for info in infos]
+        if sizes is not None:
+            sizes.update((f"{archive_path}{ARCHIVE_SEPARATOR}{info.filename}", info.file_size) for info in infos)
+        units = [(archive_path, folder_name, 'zip', names[i:i + members_per_unit])
+                 for i in range(0, len(names), members_per_unit)]
+        return units, len(names)
+    
+    if archive_path.lower().endswith('.zip'):
+        raise zipfile.BadZipFile('File is not a zip file')
+    
+    if archive_path.lower().endswith('.tar'):
+        # Uncompressed tar: data offsets allow workers to seek straight to their range
+        with tarfile.open(archive_path, 'r:') as archive:
+            members = [(member.name, member.offset_data, member.size) for member in archive.getmembers()
+                       if member.isfile() and os.path.splitext(member.name)[1].lower() in IMAGE_EXTENSIONS]
+        if sizes is not None:
+            sizes.update((f"{archive_path}{ARCHIVE_SEPARATOR}{name}", size) for name, _, size in members)
+        units = [(archive_path, folder_name, 'tar', members[i:i + members_per_unit])
+                 for i in range(0, len(members), members_per_unit)]
+        return units, len(members)
+    
+    return [(archive_path, folder_name, 'tar-stream', None)], None
 
 def create_image_batches(image_tasks, batch_size=50):
     """Create batches of images for processing"""
     for i in range(0, len(image_tasks), batch_size):
         yield image_tasks[i:i + batch_size]
 
+def iter_work_units(image_tasks, batch_size, archive_units=()):
+    """Yield (worker, payload, accounting batch) for file batches, then archive ranges
+    
+    The accounting batch lists the (path, folder, filename) tasks a unit covers;
+    it is empty for streamed archives, whose members are counted as they are found.
+    batch_size may be a function of a batch's first task, called as each batch
+    is cut, so sizes can follow the job's progress (see BatchPlanner).
+    """
+    position = 0
+    while position < len(image_tasks):
+        size = batch_size(image_tasks[position]) if callable(batch_size) else batch_size
+        batch = image_tasks[position:position + size]
+        position += size
+        yield process_single_image_batch, batch, batch
+    for unit in archive_units:
+        archive_path, folder_name, kind, members = unit
+        archive_name = os.path.basename(archive_path)
+        batch = []
+        for member in members or ():
+            member_name = member if kind == 'zip' else member[0]
+            batch.append((f"{archive_path}{ARCHIVE_SEPARATOR}{member_name}", folder_name,
+                          f"{archive_name}{ARCHIVE_SEPARATOR}{member_name}"))
+        yield process_archive_members, unit, batch
+
+class BatchPlanner:
+    """Batch sizes and the submit cut-off for one run
+    
+    Files moved to the front of the queue (likely corrupt, size outliers) go
+    out in small batches so their verdicts arrive early. Under a time budget
+    a rolling per-image cost from the workers' own timings caps each batch at
+    a fraction of the remaining budget, and work whose projected finish is
+    past the deadline is not submitted at all.
+    """
+
+    def __init__(self, batch_size, workers, deadline=None):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.deadline = deadline
+        self.cost = None  # Worker seconds per image, EWMA over completed batches
+        self.head = set()
+        self.head_batch_size = batch_size
+
+    def prioritize(self, tasks):
+        """Mark tasks at the front of the queue for small batches"""
+        self.head.update(task[0] for task in tasks)
+        self.head_batch_size = max(PROBE_BATCH_SIZE, min(self.batch_size, len(self.head) // (self.workers * 16)))
+
+    def size(self, task):
+        """Size of the batch starting at `task`"""
+        size = self.head_batch_size if task[0] in self.head else self.batch_size
+        if self.deadline:
+            if self.cost is None:
+                return min(size, PROBE_BATCH_SIZE)
+            # Short batches also keep the stalest-first order close to the order checked
+            remaining = max(0.0, self.deadline - time.time())
+            size = min(size, int(min(remaining * BUDGET_BATCH_FRACTION, BUDGET_BATCH_SECONDS) / self.cost))
+        return max(1, size)
+
+    def observe(self, batch_results):
+        """Fold a completed unit's check time into the per-image cost"""
+        stats = batch_results['stats']
+        if stats['images']:
+            seconds = sum(hist[-2] for (stage, _, _), hist in stats['histograms'].items()) / stats['images']
+            self.cost = seconds if self.cost is None else self.cost + 0.3 * (seconds - self.cost)
+
+    def fits(self, images, in_flight_images):
+        """True if `images` more can finish before the deadline behind what is in flight"""
+        if not self.deadline or self.cost is None:
+            return True
+        return time.time() + (in_flight_images + images) * self.cost / self.workers <= self.deadline
+
+class DeviceQueues:
+    """Work unit queues per storage device, served round-robin within per-device in-flight limits"""
+
+    def __init__(self, queues, limits):
+        self.queues = deque(queues.items())  # (device, iterator of work units)
+        self.limits = limits  # device -> max units in flight; missing means no limit
+        self.in_flight = {}
+
+    def next_unit(self):
+        """(device, unit) from the next device with spare capacity, or (None, None)"""
+        for _ in range(len(self.queues)):
+            device, units = self.queues[0]
+            self.queues.rotate(-1)
+            limit = self.limits.get(device)
+            if limit is not None and self.in_flight.get(device, 0) >= limit:
+                continue
+            unit = next(units, None)
+            if unit is None:
+                self.queues.pop()  # Drained; it was just rotated to the end
+                continue
+            self.in_flight[device] = self.in_flight.get(device, 0) + 1
+            return device, unit
+        return None, None
+
+    def exhausted(self):
+        """True once every device's queue has been drained"""
+        return not self.queues
+
+    def remaining(self):
+        """Drain and return every unit not yet handed out"""
+        units = [unit for _, queue in self.queues for unit in queue]
+        self.queues.clear()
+        return units
+
+    def done(self, device):
+        """A unit from `device` has completed"""
+        self.in_flight[device] -= 1
+
+def device_is_rotational(device):
+    """True if an st_dev is a spinning disk according to Linux sysfs; False when unknown"""
+    if not hasattr(os, 'major'):
+        return False
+    block = f'/sys/dev/block/{os.major(device)}:{os.minor(device)}'
+    # Partitions keep their queue settings on the parent disk
+    for candidate in (block, os.path.join(block, '..')):
+        try:
+            with open(os.path.join(candidate, 'queue', 'rotational')) as f:
+                return f.read().strip() == '1'
+        except OSError:
+            continue
+    return False
+
+def plan_device_queues(image_tasks, archive_units, batch_size, device_processes, keep_order=False):
+    """Group work by st_dev, each device's files in inode order, with per-device limits
+    
+    The device costs one stat per folder and inodes come from scandir (free on
+    POSIX). Inode order approximates on-disk order, so spinning disks read
+    close to sequentially; they default to ROTATIONAL_DEFAULT_PROCESSES units
+    in flight unless device_processes (path on the device -> limit) says
+    otherwise. With keep_order, an explicit ordering (budget, prioritize, size
+    prefilter) is preserved.
+    """
+    folder_devices = {}
+    inodes = {}
+    for directory in {os.path.dirname(task[0]) for task in image_tasks}:
+        try:
+            folder_devices[directory] = os.stat(directory).st_dev
+            if not keep_order:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        inodes[entry.path] = entry.inode()
+        except OSError as e:
+            print(f"Error reading device info for {directory}: {str(e)}")
+    
+    task_queues = {}
+    for task in image_tasks:
+        task_queues.setdefault(folder_devices.get(os.path.dirname(task[0]), -1), []).append(task)
+    if not keep_order:
+        for tasks in task_queues.values():
+            tasks.sort(key=lambda task: inodes.get(task[0], 0))
+    archive_queues = {}
+    for unit in archive_units:
+        try:
+            device = os.stat(unit[0]).st_dev
+        except OSError:
+            device = -1
+        archive_queues.setdefault(device, []).append(unit)
+    
+    limits = {}
+    for path, limit in device_processes.items():
+        try:
+            limits[os.stat(path).st_dev] = limit
+        except OSError as e:
+            print(f"Ignoring device limit for {path}: {str(e)}")
+    devices = {}
+    for device in set(task_queues) | set(archive_queues):
+        rotational = device_is_rotational(device)
+        limit_source = 'device_processes' if device in limits else None
+        if limit_source is None and rotational:
+            limits[device] = ROTATIONAL_DEFAULT_PROCESSES
+            limit_source = 'rotational default'
+        devices[str(device)] = {
+            'images': len(task_queues.get(device, ())),
+            'archives': len(archive_queues.get(device, ())),
+            'rotational': rotational,
+            'max_in_flight': limits.get(device),
+            'limit_source': limit_source,
+        }
+    processing_status['devices'] = devices
+    
+    return DeviceQueues({
+        device: iter_work_units(task_queues.get(device, []), batch_size, archive_queues.get(device, []))
+        for device in set(task_queues) | set(archive_queues)
+    }, limits)
+
 def count_images_in_folders(main_folder_path, folder_names):
     """Count total images for progress tracking"""
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.ico'}
     total = 0
     
     for folder_name in folder_names:
@@ -200,15 +1607,342 @@ def count_images_in_folders(main_folder_path, folder_names):
                 for filename in files:
                     if os.path.isfile(os.path.join(folder_path, filename)):
                         file_ext = os.path.splitext(filename)[1].lower()
-                        if file_ext in image_extensions:
+                        if file_ext in IMAGE_EXTENSIONS:
                             total += 1
             except:
                 continue
     return total
 
-def process_folders_ultra_fast(main_folder_path, folder_names, max_processes):
-    """Ultra-fast processing using optimized multiprocessing"""
-    global processing_status
+def hash_file_contents(file_path, chunk_size=1024 * 1024):
+    """Stream a file through BLAKE2b and return its hex digest"""
+    digest = hashlib.blake2b(digest_size=16)
+    throttle_io(opens=1)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            throttle_io(len(chunk))
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def checksum_file(file_path, algorithm='sha256', chunk_size=HASH_CHUNK_BYTES):
+    """Hash a file with large reads into one reused buffer and return the hex digest
+    
+    hashlib releases the GIL while hashing each chunk, so threads scale.
+    """
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    throttle_io(opens=1)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            throttle_io(count)
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+def manifest_key(relative_path):
+    """Normalize a manifest path so Windows and POSIX manifests compare equal"""
+    key = relative_path.replace('\\', '/')
+    while key.startswith('./'):
+        key = key[2:]
+    return key
+
+def unescape_manifest_path(path):
+    """Undo sha256sum's escaping of backslashes and newlines in a file name"""
+    parts = path.split('\\\\')
+    return '\\'.join(part.replace('\\n', '\n').replace('\\r', '\r') for part in parts)
+
+def load_manifest(manifest_path):
+    """Load a checksum manifest into {relative path: (digest bytes, size or None)}
+    
+    Accepts sha256sum-style lines ('<hex>  <path>', '*' marking binary mode, a
+    leading backslash marking an escaped path; md5/sha1/sha512 are recognized
+    by digest length) and our own format
+    ('<hex>\t<size>\t<path>' after a MANIFEST_HEADER line). Digests are kept as
+    bytes, half the memory of hex strings. Returns (entries, algorithm).
+    """
+    entries = {}
+    algorithm = None
+    with open(manifest_path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('#'):
+                continue
+            if '\t' in line:
+                digest, size, path = line.split('\t', 2)
+                size = int(size)
+            else:
+                escaped = line.startswith('\\')
+                digest, _, path = line[escaped:].partition(' ')
+                if path[:1] in (' ', '*'):
+                    path = path[1:]
+                if escaped:
+                    path = unescape_manifest_path(path)
+                size = None
+            line_algorithm = MANIFEST_ALGORITHMS.get(len(digest))
+            if line_algorithm is None or (algorithm and line_algorithm != algorithm) or not path:
+                raise ValueError(f'{os.path.basename(manifest_path)} line {line_number}: not a checksum entry')
+            algorithm = line_algorithm
+            entries[manifest_key(path)] = (bytes.fromhex(digest), size)
+    return entries, algorithm or 'sha256'
+
+def write_manifest(rows, algorithm='sha256'):
+    """Write (relative path, hex digest, size) rows as our own manifest next to the results"""
+    manifest_path = get_unique_filename(get_results_folder(), 'Manifest', f'.{algorithm}')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        f.write(f"{MANIFEST_HEADER} {algorithm}\n")
+        for relative_path, digest, size in sorted(rows):
+            f.write(f"{digest}\t{size}\t{relative_path}\n")
+    processing_status['manifest_file'] = manifest_path
+    return manifest_path
+
+def checksum_tasks(main_folder_path, tasks, max_workers, algorithm='sha256', on_done=None):
+    """Hash (path, folder, filename) tasks on a thread pool; returns [(relative path, digest, size)]
+    
+    Files that cannot be read are left out. on_done(task, digest) is called as
+    each file finishes, with digest None for unreadable files.
+    """
+    def checksum_task(task):
+        try:
+            return checksum_file(task[0], algorithm), os.path.getsize(task[0])
+        except OSError as e:
+            print(f"Error hashing {task[0]}: {str(e)}")
+            return None, None
+    
+    rows = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for task, (digest, size) in zip(tasks, executor.map(checksum_task, tasks)):
+            if digest is not None:
+                rows.append((manifest_key(os.path.relpath(task[0], main_folder_path)), digest, size))
+            if on_done is not None:
+                on_done(task, digest)
+    return rows
+
+def group_duplicate_images(image_tasks, max_workers):
+    """Collapse hardlinks, symlinks and identical copies to one task per group
+    
+    Returns (representative_tasks, duplicates) where duplicates maps a
+    representative path to the other tasks that share its content.
+    """
+    # Stage 1: hardlinks and symlinks resolve to the same (st_dev, st_ino)
+    inode_groups = {}
+    representatives = []
+    for task in image_tasks:
+        try:
+            st = os.stat(task[0])
+        except OSError:
+            representatives.append((task, None))
+            continue
+        key = (st.st_dev, st.st_ino)
+        if key in inode_groups:
+            inode_groups[key][1].append(task)
+        else:
+            inode_groups[key] = (st.st_size, [task])
+    
+    # Stage 2: only inode groups sharing a size with another need hashing
+    by_size = {}
+    for size, members in inode_groups.values():
+        by_size.setdefault(size, []).append(members)
+    
+    to_hash = [members for groups in by_size.values() if len(groups) > 1 for members in groups]
+    digests = {}
+    if to_hash:
+        # hashlib releases the GIL on large updates, so threads overlap reads
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            future_to_members = {executor.submit(hash_file_contents, members[0][0]): members for members in to_hash}
+            for future in as_completed(future_to_members):
+                members = future_to_members[future]
+                try:
+                    digests[id(members)] = future.result()
+                except OSError:
+                    pass
+    
+    content_groups = {}
+    for size, groups in by_size.items():
+        for members in groups:
+            digest = digests.get(id(members))
+            if digest is None:
+                representatives.append((members[0], members[1:]))
+                continue
+            key = (size, digest)
+            if key in content_groups:
+                content_groups[key].extend(members)
+            else:
+                content_groups[key] = list(members)
+    for members in content_groups.values():
+        representatives.append((members[0], members[1:]))
+    
+    # Keep the original listing order for the representatives
+    order = {task[0]: i for i, task in enumerate(image_tasks)}
+    representatives.sort(key=lambda item: order[item[0][0]])
+    duplicates = {task[0]: others for task, others in representatives if others}
+    return [task for task, _ in representatives], duplicates
+
+def read_cpu_times():
+    """Read aggregate CPU jiffies from /proc/stat, or None where unavailable"""
+    try:
+        with open('/proc/stat', 'r') as f:
+            fields = f.readline().split()
+        if fields[0] != 'cpu':
+            return None
+        return [int(value) for value in fields[1:9]]
+    except (OSError, ValueError, IndexError):
+        return None
+
+def cpu_usage_between(before, after):
+    """Return (utilization, iowait) fractions between two CPU samples"""
+    if before is None or after is None:
+        return None, None
+    deltas = [b - a for a, b in zip(before, after)]
+    total = sum(deltas)
+    if total <= 0:
+        return None, None
+    idle, iowait = deltas[3], deltas[4]
+    return 1 - (idle + iowait) / total, iowait / total
+
+class ConcurrencyController:
+    """Hill-climbing controller that tunes active workers to maximize images/sec"""
+
+    def __init__(self, initial, minimum, maximum, interval=3.0, tolerance=0.05):
+        self.workers = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.interval = interval
+        self.tolerance = tolerance
+        self.direction = 1
+        self.last_rate = None
+        self.last_time = time.time()
+        self.last_count = 0
+        self.last_cpu = read_cpu_times()
+        self.decisions = deque(maxlen=50)
+
+    def update(self, processed_images):
+        """Take one hill-climbing step per interval; returns True if a step was taken"""
+        now = time.time()
+        if now - self.last_time < self.interval:
+            return False
+        
+        rate = (processed_images - self.last_count) / (now - self.last_time)
+        cpu = read_cpu_times()
+        utilization, iowait = cpu_usage_between(self.last_cpu, cpu)
+        
+        if self.last_rate is None:
+            reason = 'initial probe'
+        elif rate < self.last_rate * (1 - self.tolerance):
+            self.direction = -self.direction
+            reason = 'throughput fell, reversing'
+        elif rate <= self.last_rate * (1 + self.tolerance):
+            # Flat throughput: back off if a resource is already saturated
+            if (utilization is not None and utilization > 0.9) or (iowait is not None and iowait > 0.3):
+                self.direction = -1
+                reason = 'throughput flat with saturated CPU or I/O, backing off'
+            else:
+                reason = 'throughput flat, probing'
+        else:
+            reason = 'throughput improved, continuing'
+        
+        # Reverse at the bounds instead of sticking there
+        target = self.workers + self.direction
+        if target < self.minimum or target > self.maximum:
+            self.direction = -self.direction
+            target = self.workers + self.direction
+        previous = self.workers
+        self.workers = max(self.minimum, min(self.maximum, target))
+        
+        self.decisions.append({
+            'time': datetime.now().strftime('%H:%M:%S'),
+            'images_per_second': round(rate, 1),
+            'cpu_utilization': round(utilization, 3) if utilization is not None else None,
+            'iowait': round(iowait, 3) if iowait is not None else None,
+            'from_workers': previous,
+            'to_workers': self.workers,
+            'reason': reason,
+        })
+        
+        self.last_rate = rate
+        self.last_time = now
+        self.last_count = processed_images
+        self.last_cpu = cpu
+        return True
+
+class ThroughputTracker:
+    """EWMA images/sec and MB/sec for one job, plus a ring buffer of per-second samples
+    
+    Completions are binned by wall-clock second. Each closed second feeds the
+    averages, so a stall or a slow folder shows up within a few time constants
+    instead of being diluted by the whole run like the cumulative average.
+    """
+
+    def __init__(self):
+        self.second = None  # Second currently being filled; None until the first completion
+        self.images = 0
+        self.bytes = 0
+        self.image_rate = 0.0
+        self.byte_rate = 0.0
+        self.weight = 0.0  # For the startup bias correction of the averages
+        self.alpha = 1 - math.exp(-1 / THROUGHPUT_EWMA_SECONDS)
+        self.samples = deque(maxlen=THROUGHPUT_SAMPLES)
+        self.lock = threading.Lock()
+
+    def roll(self, now):
+        """Close every whole second before now into the samples and the averages"""
+        current = int(now)
+        if self.second is None or current <= self.second:
+            return
+        # A long stall only needs enough empty seconds to fill the buffer
+        for second in range(max(self.second, current - THROUGHPUT_SAMPLES), current):
+            images, nbytes = (self.images, self.bytes) if second == self.second else (0, 0)
+            self.image_rate += self.alpha * (images - self.image_rate)
+            self.byte_rate += self.alpha * (nbytes - self.byte_rate)
+            self.weight += self.alpha * (1 - self.weight)
+            self.samples.append({'time': second, 'images': images, 'mb': round(nbytes / (1024 * 1024), 3)})
+        self.second = current
+        self.images = self.bytes = 0
+
+    def add(self, images, nbytes):
+        """Count completed images and the bytes they read"""
+        now = time.time()
+        with self.lock:
+            if self.second is None:
+                self.second = int(now)
+            self.roll(now)
+            self.images += images
+            self.bytes += nbytes
+
+    def publish(self, status):
+        """Write the live rates, samples and ETA into the status
+        
+        The ETA uses bytes remaining where the job knows its total bytes, since
+        a few huge files can take longer than thousands of thumbnails.
+        """
+        with self.lock:
+            self.roll(time.time())
+            image_rate = self.image_rate / self.weight if self.weight else 0.0
+            byte_rate = self.byte_rate / self.weight if self.weight else 0.0
+            status['throughput_samples'] = list(self.samples)
+        status['live_images_per_second'] = round(image_rate, 1)
+        status['live_mb_per_second'] = round(byte_rate / (1024 * 1024), 2)
+        
+        eta = None
+        basis = None
+        if status.get('total_bytes') and byte_rate > 0:
+            eta = max(0, status['total_bytes'] - status['processed_bytes']) / byte_rate
+            basis = 'bytes'
+        elif status.get('total_images') and image_rate > 0:
+            eta = max(0, status['total_images'] - status['processed_images']) / image_rate
+            basis = 'images'
+        if not status.get('is_processing'):
+            eta = 0 if basis else None
+        status['eta_seconds'] = round(eta, 1) if eta is not None else None
+        status['eta_basis'] = basis
+
+throughput = None
+
+def begin_job(folder_names, max_processes, options):
+    """Reset the shared status for a new job and return its resolved options"""
+    global io_throttle, throughput
+    options = dict(options or {})
     
     processing_status['is_processing'] = True
     processing_status['corrupt_images'] = []
@@ -217,82 +1951,1657 @@ def process_folders_ultra_fast(main_folder_path, folder_names, max_processes):
     processing_status['processed_images'] = 0
     processing_status['start_time'] = time.time()
     processing_status['max_processes'] = max_processes
+    processing_status['profile_file'] = None
+    processing_status['slowest_images'] = []
+    processing_status['duplicate_images'] = 0
+    processing_status['format_mismatches'] = []
+    processing_status['active_processes'] = 0
+    processing_status['concurrency_decisions'] = []
+    processing_status['sample_estimates'] = {}
+    processing_status['coverage'] = None
+    processing_status['prioritized_images'] = 0
+    processing_status['size_profiles'] = {}
+    processing_status['size_outliers'] = []
+    processing_status['archive_count'] = 0
+    processing_status['frames_checked'] = 0
+    processing_status['multi_frame_images'] = 0
+    processing_status['large_images'] = 0
+    processing_status['history_run'] = None
+    processing_status['devices'] = {}
+    processing_status['manifest_report'] = None
+    processing_status['manifest_file'] = None
+    processing_status['manifest_base'] = None
+    processing_status['total_bytes'] = 0
+    processing_status['processed_bytes'] = 0
+    throughput = ThroughputTracker()
+    throughput.publish(processing_status)
     
-    # Count total images first
-    processing_status['total_images'] = count_images_in_folders(main_folder_path, folder_names)
+    # Shared I/O throttle for this job; /set_io_limits adjusts it while the job runs
+    io_throttle = IOThrottle(options.get('max_mb_per_second', 0) * 1024 * 1024, options.get('max_opens_per_second', 0))
+    processing_status['io_limits'] = io_throttle.limits()
+    processing_status['mode'] = options.get('mode', 'full')
+    processing_status['engine'] = options.get('engine', 'process')
+    options.setdefault('slowest_limit', SLOWEST_IMAGES_LIMIT)
     
-    # Supported image extensions
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.ico'}
+    # Profiling window is measured from job start in wall clock time
+    if options.get('profile') and options.get('profile_seconds'):
+        options['profile_until'] = processing_status['start_time'] + options['profile_seconds']
+    return options
+
+def collect_folder_images(main_folder_path, folder_name, sizes=None):
+    """List (path, folder, filename) tasks for the images in one folder, or None if missing
     
-    # Collect all image tasks
-    image_tasks = []
+    If a sizes dict is given, each image's size in bytes is recorded in it by path.
+    """
+    folder_path = os.path.join(main_folder_path, folder_name)
+    if not os.path.exists(folder_path):
+        return None
     
-    for folder_name in folder_names:
-        folder_name = folder_name.strip()
+    image_tasks = []
+    try:
+        for entry in os.scandir(folder_path):
+            if entry.is_file():
+                file_ext = os.path.splitext(entry.name)[1].lower()
+                if file_ext in IMAGE_EXTENSIONS:
+                    image_tasks.append((entry.path, folder_name, entry.name))
+                    if sizes is not None:
+                        sizes[entry.path] = entry.stat().st_size
+    except Exception as e:
+        print(f"Error accessing folder {folder_name}: {str(e)}")
+    return image_tasks
+
+def collect_folder_archives(main_folder_path, folder_name):
+    """List (archive_path, folder) pairs for the zip/tar archives in one folder"""
+    folder_path = os.path.join(main_folder_path, folder_name)
+    archives = []
+    try:
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if is_archive_file(entry.name) and entry.is_file():
+                    archives.append((entry.path, folder_name))
+    except OSError as e:
+        print(f"Error listing archives in {folder_name}: {str(e)}")
+    return archives
+
+class ScanAccumulator:
+    """Folds worker batch results into the shared status for one job"""
+
+    def __init__(self, options, duplicates=None, history=None, sizes=None):
+        self.slowest_limit = options['slowest_limit']
+        self.slowest_heap = []
+        self.profile_stats = None
+        self.duplicates = duplicates or {}
+        self.corrupt_paths = set()
+        self.extra_units = deque()  # Work discovered by workers, e.g. frame ranges
+        self.history = history
+        self.failures = 0  # Units whose worker raised, so their files went unchecked
+        self.sizes = sizes or {}  # Listed file sizes, for the bytes of batches that failed
+        # Tasks of units whose worker returned, i.e. actually checked (kept for write_manifest)
+        self.completed = [] if options.get('write_manifest') else None
+
+    def batch_weight(self, batch):
+        """Number of files a batch accounts for, including deduplicated copies"""
+        if not self.duplicates:
+            return len(batch)
+        return len(batch) + sum(len(self.duplicates.get(task[0], ())) for task in batch)
+
+    def add(self, batch, batch_results):
+        """Record a completed batch"""
+        weight = self.batch_weight(batch)
+        nbytes = batch_results['stats']['bytes_read']
+        if not batch:
+            # Units without an accounting batch are counted from what the worker checked:
+            # streamed archive members count as images, split-off frame ranges do not
+            weight = batch_results['stats']['images']
+            processing_status['total_images'] += weight
+            if processing_status['total_bytes']:
+                processing_status['total_bytes'] += nbytes
+        
+        # A file can be reported by several units (e.g. frame ranges); list it once
+        for item in batch_results['corrupt_images']:
+            if item['path'] not in self.corrupt_paths:
+                self.corrupt_paths.add(item['path'])
+                processing_status['corrupt_images'].append(item)
+        processing_status['format_mismatches'].extend(batch_results['format_mismatches'])
+        processing_status['frames_checked'] += batch_results['frames_checked']
+        processing_status['multi_frame_images'] += batch_results['multi_frame_images']
+        processing_status['large_images'] += batch_results['large_images']
+        for deferred in batch_results['deferred_frames']:
+            self.extra_units.extend(plan_frame_units(deferred))
+        merge_batch_stats(batch_results['stats'])
+        if self.completed is not None:
+            self.completed.extend(batch)
+        if self.history is not None:
+            self.history.add(self.history_rows(batch, batch_results))
+        
+        # Apply each representative's verdict to its duplicates, late frame-range findings included
+        for item in batch_results['corrupt_images']:
+            for path, folder, filename in self.duplicates.get(item['path'], ()):
+                if path not in self.corrupt_paths:
+                    self.corrupt_paths.add(path)
+                    processing_status['corrupt_images'].append({'folder': folder, 'image': filename, 'path': path})
+        if batch and weight > len(batch):
+            with metrics_lock:
+                metrics['cache_hits'] += weight - len(batch)
+        
+        # Keep the job-wide top-N slowest images
+        if batch_results['slowest']:
+            for record in batch_results['slowest']:
+                track_slowest(self.slowest_heap, record, self.slowest_limit)
+            processing_status['slowest_images'] = [
+                entry[2] for entry in sorted(self.slowest_heap, reverse=True)[:self.slowest_limit]
+            ]
+        
+        # Merge worker profiles into a single pstats object
+        if batch_results['profile']:
+            snapshot = ProfileSnapshot(batch_results['profile'])
+            if self.profile_stats is None:
+                self.profile_stats = pstats.Stats(snapshot)
+            else:
+                self.profile_stats.add(snapshot)
+        
+        self.advance(weight, nbytes)
+
+    def history_rows(self, batch, batch_results):
+        """Verdict rows for everything a completed unit checked, duplicates included"""
+        now = time.time()
+        reasons = {item['path']: item.get('reason') for item in batch_results['corrupt_images']}
+        rows = []
+        for path, folder, filename in list(batch) + batch_results['members_checked']:
+            corrupt = int(path in reasons)
+            rows.append((path, folder, filename, corrupt, reasons.get(path), now))
+            for member in self.duplicates.get(path, ()):
+                rows.append((*member, corrupt, reasons.get(path), now))
+        
+        # Findings for files accounted elsewhere, e.g. split-off frame ranges or whole archives
+        listed = {row[0] for row in rows}
+        for item in batch_results['corrupt_images']:
+            if item['path'] not in listed:
+                rows.append((item['path'], item['folder'], item['image'], 1, item.get('reason'), now))
+                for member in self.duplicates.get(item['path'], ()):
+                    rows.append((*member, 1, item.get('reason'), now))
+        return rows
+
+    def failed(self, batch, error):
+        """Record a batch whose worker raised"""
+        print(f"Error processing batch: {str(error)}")
+        self.failures += 1
+        # Still update progress even if batch failed
+        self.advance(self.batch_weight(batch), sum(self.sizes.get(task[0], 0) for task in batch))
+
+    def advance(self, count, nbytes=0):
+        """Update progress and speed"""
+        processing_status['processed_images'] += count
+        processing_status['processed_bytes'] += nbytes
+        throughput.add(count, nbytes)
+        
+        # Calculate speed
+        elapsed_time = time.time() - processing_status['start_time']
+        if elapsed_time > 0:
+            processing_status['images_per_second'] = int(processing_status['processed_images'] / elapsed_time)
+
+def end_job():
+    """Mark the job as finished and remove its I/O throttle from this process"""
+    global io_throttle
+    io_throttle = None
+    processing_status['is_processing'] = False
+
+def finish_job(accumulator):
+    """Save results, close the run's history and mark the job as finished"""
+    save_results(accumulator.profile_stats)
+    if accumulator.history is not None:
+        # Findings made outside the workers, e.g. archives that could not be listed
+        now = time.time()
+        accumulator.history.add([
+            (item['path'], item['folder'], item['image'], 1, item.get('reason'), now)
+            for item in processing_status['corrupt_images'] if item['path'] not in accumulator.corrupt_paths
+        ])
+        coverage = processing_status.get('coverage')
+        accumulator.history.close(complete=not accumulator.failures and not (coverage and coverage['not_checked']))
+    end_job()
+
+def order_by_staleness(conn, image_tasks):
+    """Order tasks for a budgeted run: never verified or changed first, then least recently verified
+    
+    Returns (ordered_tasks, file_stats, never_verified, stale_count) where
+    file_stats maps path to (size, mtime) for recording verification state
+    afterwards and the first stale_count tasks are never verified or changed.
+    """
+    # Load recorded state one directory at a time via the directory index
+    recorded = {}
+    for directory in {os.path.dirname(task[0]) for task in image_tasks}:
+        for path, size, mtime, verified_at in conn.execute(
+                'SELECT path, size, mtime, verified_at FROM last_verified WHERE directory = ?', (directory,)):
+            recorded[path] = (size, mtime, verified_at)
+    
+    keyed = []
+    file_stats = {}
+    never_verified = set()
+    for task in image_tasks:
+        try:
+            st = os.stat(task[0])
+            size, mtime = st.st_size, st.st_mtime
+        except OSError:
+            size, mtime = None, None
+        file_stats[task[0]] = (size, mtime)
+        state = recorded.get(task[0])
+        if state is None:
+            never_verified.add(task[0])
+            key = (0, -(mtime or 0))
+        elif state[0] != size or state[1] != mtime:
+            key = (0, -(mtime or 0))  # Modified since last verification, newest first
+        else:
+            key = (1, state[2])  # Least recently verified first
+        keyed.append((key, task))
+    keyed.sort(key=lambda item: item[0])
+    stale_count = sum(1 for key, _ in keyed if key[0] == 0)
+    return [task for _, task in keyed], file_stats, never_verified, stale_count
+
+def record_verified(conn, batch, corrupt_paths, file_stats, duplicates):
+    """Record verification time and verdict for every file a batch accounted for"""
+    now = time.time()
+    rows = []
+    for path, _, _ in batch:
+        if path not in file_stats:
+            continue  # Archive members have no verification state of their own
+        members = [path] + [member[0] for member in duplicates.get(path, ())]
+        for member in members:
+            size, mtime = file_stats.get(member, (None, None))
+            rows.append((member, os.path.dirname(member), size, mtime, now, int(path in corrupt_paths)))
+    conn.executemany('INSERT OR REPLACE INTO last_verified VALUES (?, ?, ?, ?, ?, ?)', rows)
+    conn.commit()
+
+def prioritize_likely_corrupt(image_tasks, max_workers):
+    """Move files with cheap corruption signals to the front of the queue
+    
+    Signals are tiny sizes, a failed quick_file_check, a recent mtime and a size
+    far from the folder median. Returns (ordered_tasks, flagged_count).
+    """
+    stats = {}
+    for task in image_tasks:
+        try:
+            st = os.stat(task[0])
+            stats[task[0]] = (st.st_size, st.st_mtime)
+        except OSError:
+            stats[task[0]] = (None, None)
+    
+    # Folder medians for the size outlier signal
+    folder_sizes = {}
+    for task in image_tasks:
+        size = stats[task[0]][0]
+        if size:
+            folder_sizes.setdefault(task[1], []).append(size)
+    folder_medians = {folder: median(sizes) for folder, sizes in folder_sizes.items()}
+    
+    # Header/trailer checks only read a few bytes, so threads overlap the opens
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        quick_failed = dict(zip(
+            (task[0] for task in image_tasks),
+            executor.map(lambda task: quick_file_check(task[0], stats[task[0]][0]), image_tasks),
+        ))
+    
+    now = time.time()
+    scored = []
+    flagged = 0
+    for task in image_tasks:
+        size, mtime = stats[task[0]]
+        score = 0
+        if quick_failed[task[0]]:
+            score += PRIORITY_WEIGHTS['quick_check_failed']
+        if size is not None and size < TINY_FILE_BYTES:
+            score += PRIORITY_WEIGHTS['tiny']
+        folder_median = folder_medians.get(task[1])
+        if size and folder_median and (size * SIZE_OUTLIER_FACTOR < folder_median or size > folder_median * SIZE_OUTLIER_FACTOR):
+            score += PRIORITY_WEIGHTS['size_outlier']
+        if mtime is not None and now - mtime < RECENT_MTIME_SECONDS:
+            score += PRIORITY_WEIGHTS['recent']
+        if score:
+            flagged += 1
+        scored.append((-score, task))
+    
+    # Stable sort keeps the existing order within each score
+    scored.sort(key=lambda item: item[0])
+    return [task for _, task in scored], flagged
+
+def folder_size_profile(folder_path, folder_name, threshold=SIZE_OUTLIER_Z):
+    """Profile one folder's image sizes from scandir data and flag size outliers
+    
+    Sizes are compared on a log10 scale with median/MAD per extension, all
+    vectorized with NumPy. Returns (profile, outliers).
+    """
+    names, exts, sizes = [], [], []
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext in IMAGE_EXTENSIONS and entry.is_file():
+                names.append(entry.name)
+                exts.append(ext)
+                sizes.append(entry.stat().st_size)
+    if not sizes:
+        return {}, []
+    
+    size_arr = np.asarray(sizes, dtype=np.float64)
+    log_sizes = np.log10(size_arr + 1)
+    ext_arr = np.asarray(exts)
+    z_scores = np.zeros_like(log_sizes)
+    
+    profile = {}
+    for ext in np.unique(ext_arr):
+        mask = ext_arr == ext
+        values = log_sizes[mask]
+        center = np.median(values)
+        deviation = values - center
+        mad = np.median(np.abs(deviation))
+        # Floor the MAD so near-identical sizes do not flag tiny differences
+        z_scores[mask] = 0.6745 * deviation / max(mad, SIZE_MAD_FLOOR)
+        ext_sizes = size_arr[mask]
+        profile[str(ext)] = {
+            'count': int(mask.sum()),
+            'median_bytes': int(np.median(ext_sizes)),
+            'mad_log10': round(float(mad), 4),
+            'min_bytes': int(ext_sizes.min()),
+            'p5_bytes': int(np.percentile(ext_sizes, 5)),
+            'p95_bytes': int(np.percentile(ext_sizes, 95)),
+            'max_bytes': int(ext_sizes.max()),
+            'outliers': int((np.abs(z_scores[mask]) > threshold).sum()),
+        }
+    
+    outliers = []
+    for i in np.flatnonzero(np.abs(z_scores) > threshold):
+        outliers.append({
+            'folder': folder_name,
+            'image': names[i],
+            'path': os.path.join(folder_path, names[i]),
+            'bytes': sizes[i],
+            'robust_z': round(float(z_scores[i]), 2),
+        })
+    return profile, outliers
+
+def size_prefilter(main_folder_path, folder_names):
+    """Run the size profile over every folder; returns (profiles, outliers)"""
+    profiles = {}
+    outliers = []
+    for folder_name in folder_names:
+        folder_path = os.path.join(main_folder_path, folder_name)
+        try:
+            profile, folder_outliers = folder_size_profile(folder_path, folder_name)
+        except OSError as e:
+            print(f"Error profiling folder {folder_name}: {str(e)}")
+            continue
+        if profile:
+            profiles[folder_name] = profile
+            outliers.extend(folder_outliers)
+    return profiles, outliers
+
+def enumerate_plan_targets(main_folder_path, folder_names):
+    """Group the images of the selected folders by (format, size bucket) using scandir stat data
+    
+    Returns ({(format, bucket): [(path, size), ...]}, archive count, missing folders).
+    """
+    strata = {}
+    archives = 0
+    missing = []
+    for folder_name in folder_names:
+        try:
+            entries = list(os.scandir(os.path.join(main_folder_path, folder_name)))
+        except OSError:
+            missing.append(folder_name)
+            continue
+        for entry in entries:
+            try:
+                if not entry.is_file():
+                    continue
+                extension = os.path.splitext(entry.name)[1].lower()
+                if extension in IMAGE_EXTENSIONS:
+                    size = entry.stat().st_size
+                    key = (EXTENSION_FORMATS[extension], size_bucket_label(size))
+                    strata.setdefault(key, []).append((entry.path, size))
+                elif is_archive_file(entry.name):
+                    archives += 1
+            except OSError:
+                continue
+    return strata, archives, missing
+
+def plan_level_decoders(level):
+    """Format -> backend map a check level decodes with, as a scan with its settings would"""
+    settings = PLAN_CHECK_LEVELS[level]
+    return resolve_decoders(settings.get('decoder', 'pillow'), settings.get('reduced_decode', False))
+
+def time_check_levels(strata, sample_size, levels):
+    """Time each check level on a stratified sample, in this process
+    
+    Every stratum gets at least one image, the rest proportionally to its
+    count; sampling stops early after PLAN_SAMPLE_SECONDS. The level order is
+    rotated per image so no level always pays for the cold read.
+    Returns {(format, bucket): {level: [seconds, ...]}}.
+    """
+    total = sum(len(files) for files in strata.values())
+    decoders = {level: plan_level_decoders(level) for level in levels}
+    sample = []
+    for key, files in strata.items():
+        share = max(1, round(sample_size * len(files) / total)) if total else 0
+        sample.extend((key, path) for path, _ in random.sample(files, min(share, len(files))))
+    random.shuffle(sample)
+    
+    timings = {key: {level: [] for level in levels} for key in strata}
+    deadline = time.perf_counter() + PLAN_SAMPLE_SECONDS
+    for i, (key, path) in enumerate(sample):
+        if time.perf_counter() > deadline:
+            break
+        for level in levels[i % len(levels):] + levels[:i % len(levels)]:
+            settings = PLAN_CHECK_LEVELS[level]
+            timer = StageTimer()
+            deep_corruption_check(path, timer, settings.get('multi_frame'), decoders=decoders[level],
+                                  reduced_decode=settings.get('reduced_decode', False))
+            timings[key][level].append(timer.elapsed())
+    return timings
+
+def predict_level_seconds(strata, timings, level):
+    """Serial seconds to check every target at one level, with a ~95% range
+    
+    Strata that went unsampled are costed at the sample's overall seconds per byte.
+    """
+    sampled_seconds = sum(sum(times[level]) for times in timings.values())
+    sampled_bytes = sum(len(times[level]) * sum(size for _, size in strata[key]) / len(strata[key])
+                        for key, times in timings.items())
+    per_byte = sampled_seconds / sampled_bytes if sampled_bytes else None
+    
+    estimate = 0.0
+    variance = 0.0
+    for key, files in strata.items():
+        times = timings[key][level]
+        if times:
+            mean = sum(times) / len(times)
+            estimate += mean * len(files)
+            if len(times) > 1:
+                spread = sum((t - mean) ** 2 for t in times) / (len(times) - 1)
+                variance += len(files) ** 2 * spread / len(times)
+        elif per_byte is not None:
+            estimate += per_byte * sum(size for _, size in files)
+    margin = 1.96 * math.sqrt(variance)
+    return estimate, max(0.0, estimate - margin), estimate + margin
+
+def plan_scan(main_folder_path, folder_names, sample_size, target_seconds=None):
+    """Dry run: enumerate the targets, time a sample per check level and predict runtimes
+    
+    Runtime for p processes assumes CPU-bound checks that scale up to the CPU
+    count, plus the pool's startup cost; nothing is recorded or reported.
+    """
+    started = time.perf_counter()
+    strata, archives, missing = enumerate_plan_targets(main_folder_path, folder_names)
+    enumeration_seconds = time.perf_counter() - started
+    
+    # Decoder levels only differ from 'deep' for formats they map; skip them when none are present
+    formats = {key[0] for key in strata}
+    levels = [level for level in PLAN_CHECK_LEVELS
+              if not {'decoder', 'reduced_decode'} & set(PLAN_CHECK_LEVELS[level]) or formats & set(plan_level_decoders(level))]
+    started = time.perf_counter()
+    timings = time_check_levels(strata, sample_size, levels)
+    sample_seconds = time.perf_counter() - started
+    
+    cpu_count = multiprocessing.cpu_count()
+    process_counts = sorted({p for p in (1, 2, 4, 8, 16, 32, cpu_count, min(cpu_count * 2, 32)) if p <= 32})
+    predictions = {}
+    for level in levels:
+        serial, low, high = predict_level_seconds(strata, timings, level)
+        predictions[level] = {
+            'serial_seconds': round(serial, 2),
+            'by_processes': {
+                p: {
+                    'seconds': round(serial / min(p, cpu_count) + PLAN_POOL_STARTUP_SECONDS, 1),
+                    'low': round(low / min(p, cpu_count) + PLAN_POOL_STARTUP_SECONDS, 1),
+                    'high': round(high / min(p, cpu_count) + PLAN_POOL_STARTUP_SECONDS, 1),
+                }
+                for p in process_counts
+            },
+        }
+    
+    # Fewest processes within 5% of the best deep-check time; a faster decoder
+    # is only worth recommending if it saves more than 15%
+    deep = predictions['deep']['by_processes']
+    best = min(item['seconds'] for item in deep.values())
+    processes = min(p for p, item in deep.items() if item['seconds'] <= best * 1.05)
+    recommended = {'max_processes': processes}
+    level = 'deep'
+    if 'fast_decoder' in predictions and predictions['fast_decoder']['serial_seconds'] < 0.85 * predictions['deep']['serial_seconds']:
+        level = 'fast_decoder'
+    recommended.update(PLAN_CHECK_LEVELS[level])
+    recommended['predicted_seconds'] = predictions[level]['by_processes'][processes]['seconds']
+    if target_seconds and recommended['predicted_seconds'] > target_seconds:
+        # Too slow for the window: verify the stalest files first within the budget
+        recommended['budget_seconds'] = int(target_seconds)
+    
+    return {
+        'targets': {
+            'folders': len(folder_names) - len(missing),
+            'missing_folders': missing,
+            'images': sum(len(files) for files in strata.values()),
+            'bytes': sum(size for files in strata.values() for _, size in files),
+            'archives_not_estimated': archives,
+            'strata': [
+                {
+                    'format': key[0], 'size_bucket': key[1], 'images': len(files),
+                    'bytes': sum(size for _, size in files),
+                    'sampled': len(timings[key][levels[0]]),
+                    'seconds_per_image': {
+                        level: round(sum(timings[key][level]) / len(timings[key][level]), 4)
+                        for level in levels if timings[key][level]
+                    },
+                }
+                for key, files in sorted(strata.items())
+            ],
+        },
+        'enumeration_seconds': round(enumeration_seconds, 3),
+        'sample_seconds': round(sample_seconds, 2),
+        'cpu_count': cpu_count,
+        'predictions': predictions,
+        'recommended': recommended,
+    }
+
+def process_folders_ultra_fast(main_folder_path, folder_names, max_processes, options=None):
+    """Ultra-fast processing using optimized multiprocessing"""
+    global processing_status
+    options = begin_job(folder_names, max_processes, options)
+    options['defer_frames'] = True  # Large documents' later frames come back as extra units
+    
+    # Count total images first
+    processing_status['total_images'] = count_images_in_folders(main_folder_path, folder_names)
+    
+    # Collect all image tasks
+    image_tasks = []
+    archive_paths = []
+    sizes = {}
+    
+    for folder_name in folder_names:
+        folder_name = folder_name.strip()
         if not folder_name:
             continue
             
         processing_status['current_folder'] = folder_name
-        folder_path = os.path.join(main_folder_path, folder_name)
-        
-        if not os.path.exists(folder_path):
-            processing_status['processed_folders'] += 1
-            continue
-            
-        # Collect all image files in the folder
-        try:
-            files = os.listdir(folder_path)
-            for filename in files:
-                file_path = os.path.join(folder_path, filename)
-                
-                if os.path.isfile(file_path):
-                    file_ext = os.path.splitext(filename)[1].lower()
-                    if file_ext in image_extensions:
-                        image_tasks.append((file_path, folder_name, filename))
-        except Exception as e:
-            print(f"Error accessing folder {folder_name}: {str(e)}")
-        
+        folder_tasks = collect_folder_images(main_folder_path, folder_name, sizes)
+        if folder_tasks:
+            image_tasks.extend(folder_tasks)
+        if options.get('scan_archives') and folder_tasks is not None:
+            archive_paths.extend(collect_folder_archives(main_folder_path, folder_name))
         processing_status['processed_folders'] += 1
     
+    # Optional dedupe: decode one representative per group of identical files
+    duplicates = {}
+    if options.get('dedupe') and image_tasks:
+        processing_status['current_folder'] = 'Deduplicating'
+        image_tasks, duplicates = group_duplicate_images(image_tasks, max_processes)
+        processing_status['duplicate_images'] = sum(len(others) for others in duplicates.values())
+    
+    # Budgeted mode: stalest files first, stop submitting once the budget is spent
+    state_conn = None
+    deadline = None
+    priority_head = []  # Explicitly ordered front of the queue, sent in small batches
+    if options.get('budget_seconds') and image_tasks:
+        processing_status['current_folder'] = 'Ordering by staleness'
+        state_conn = open_state_db()
+        image_tasks, file_stats, never_verified, stale_count = order_by_staleness(state_conn, image_tasks)
+        deadline = processing_status['start_time'] + options['budget_seconds']
+        priority_head.extend(image_tasks[:stale_count])
+        processing_status['current_folder'] = f'Budgeted verification ({options["budget_seconds"]}s)'
+        eligible = processing_status['total_images']
+        checked = 0
+    
+    # Optional likely-corrupt-first ordering so findings surface early
+    if options.get('prioritize') and image_tasks:
+        processing_status['current_folder'] = 'Prioritizing likely corrupt files'
+        image_tasks, processing_status['prioritized_images'] = prioritize_likely_corrupt(image_tasks, max_processes)
+        priority_head.extend(image_tasks[:processing_status['prioritized_images']])
+    
+    # Optional size prefilter: outliers go to the very front for immediate checks
+    if options.get('size_prefilter') and image_tasks:
+        processing_status['current_folder'] = 'Profiling folder sizes'
+        profiles, outliers = size_prefilter(main_folder_path, folder_names)
+        processing_status['size_profiles'] = profiles
+        processing_status['size_outliers'] = outliers
+        outlier_paths = {item['path'] for item in outliers}
+        image_tasks = ([task for task in image_tasks if task[0] in outlier_paths] +
+                       [task for task in image_tasks if task[0] not in outlier_paths])
+        priority_head.extend(task for task in image_tasks if task[0] in outlier_paths)
+    
+    # Optional archive scanning: split zip/tar members into ranges for the workers
+    archive_units = []
+    if archive_paths:
+        processing_status['current_folder'] = 'Listing archives'
+        for archive_path, folder_name in archive_paths:
+            try:
+                units, member_count = plan_archive_units(archive_path, folder_name, ARCHIVE_MEMBERS_PER_UNIT, sizes)
+            except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+                # An archive that cannot even be listed is reported like a corrupt image
+                print(f"Error reading archive {archive_path}: {str(e)}")
+                processing_status['corrupt_images'].append({
+                    'folder': folder_name, 'image': os.path.basename(archive_path),
+                    'path': archive_path, 'reason': 'unreadable archive',
+                })
+                continue
+            archive_units.extend(units)
+            processing_status['total_images'] += member_count or 0
+        processing_status['archive_count'] = len(archive_paths)
+    
+    # Bytes the workers will read, for the ETA; duplicates are never read and
+    # streamed archives add theirs as they are found
+    processing_status['total_bytes'] = sum(sizes.get(task[0], 0) for task in image_tasks)
+    for _, _, members in iter_work_units([], 1, archive_units):
+        processing_status['total_bytes'] += sum(sizes.get(task[0], 0) for task in members)
+    accumulator = ScanAccumulator(options, duplicates, start_history(main_folder_path, folder_names, options), sizes)
+    not_checked = 0  # Files cut off by the budget, never submitted
+    
     # Process images using optimized multiprocessing
-    if image_tasks:
+    if image_tasks or archive_units:
         # Use user-specified max processes, with a reasonable minimum
-        actual_max_processes = max(1, min(max_processes, len(image_tasks)))
+        actual_max_processes = max(1, min(max_processes, len(image_tasks) + len(archive_units)))
+        
+        # Auto mode starts at the CPU count and tunes within [1, max_processes]
+        controller = None
+        if options.get('auto_concurrency'):
+            initial = max(1, min(multiprocessing.cpu_count(), actual_max_processes))
+            controller = ConcurrencyController(initial, 1, actual_max_processes)
+        processing_status['active_processes'] = controller.workers if controller else actual_max_processes
         
-        # Create batches for better efficiency
-        batch_size = max(5, len(image_tasks) // (actual_max_processes * 4))
-        image_batches = list(create_image_batches(image_tasks, batch_size))
+        # Create batches for better efficiency (smaller in auto and budgeted modes so changes apply quickly)
+        batch_divisor = 16 if controller or deadline else 4
+        planner = BatchPlanner(max(5, len(image_tasks) // (actual_max_processes * batch_divisor)),
+                               actual_max_processes, deadline)
+        planner.prioritize(priority_head)
+        if options.get('device_aware'):
+            processing_status['current_folder'] = 'Grouping by device'
+            explicit_order = bool(deadline or options.get('prioritize') or options.get('size_prefilter'))
+            work_queues = plan_device_queues(image_tasks, archive_units, planner.size,
+                                             options.get('device_processes', {}), keep_order=explicit_order)
+        else:
+            work_queues = DeviceQueues({None: iter_work_units(image_tasks, planner.size, archive_units)}, {})
+        future_device = {}
         
-        with ProcessPoolExecutor(max_workers=actual_max_processes) as executor:
-            # Submit all batches
-            future_to_batch = {executor.submit(process_single_image_batch, batch): batch for batch in image_batches}
+        with create_executor(options, actual_max_processes) as executor:
+            with metrics_lock:
+                metrics['active_workers'] = processing_status['active_processes']
+                metrics['queue_depth'] = len(image_tasks)
             
-            processed_batches = 0
-            # Process results as they complete
-            for future in as_completed(future_to_batch):
-                try:
-                    batch_results = future.result()
-                    processing_status['corrupt_images'].extend(batch_results)
-                    
-                    # Update progress
-                    batch = future_to_batch[future]
-                    processing_status['processed_images'] += len(batch)
-                    processed_batches += 1
-                    
-                    # Calculate speed
-                    elapsed_time = time.time() - processing_status['start_time']
-                    if elapsed_time > 0:
-                        processing_status['images_per_second'] = int(processing_status['processed_images'] / elapsed_time)
-                    
-                except Exception as e:
-                    print(f"Error processing batch: {str(e)}")
-                    # Still update progress even if batch failed
-                    batch = future_to_batch[future]
-                    processing_status['processed_images'] += len(batch)
+            future_to_batch = {}
+            batches_remaining = True
+            in_flight_images = 0
+            
+            while True:
+                # Keep the pool fed; in auto mode only `workers` batches are in flight
+                in_flight_limit = controller.workers if controller else actual_max_processes * 2
+                planner.workers = controller.workers if controller else actual_max_processes
+                if deadline and batches_remaining and time.time() >= deadline:
+                    batches_remaining = False  # Budget spent: let in-flight batches finish
+                    accumulator.extra_units.clear()
+                while (batches_remaining or accumulator.extra_units) and len(future_to_batch) < in_flight_limit:
+                    queued = not accumulator.extra_units  # Extra units bypass the device limits
+                    if queued:
+                        device, unit = work_queues.next_unit()
+                    else:
+                        unit = accumulator.extra_units.popleft()
+                    if unit is None:
+                        # Either everything is submitted or every device is at its limit
+                        batches_remaining = not work_queues.exhausted()
+                        break
+                    worker, payload, batch = unit
+                    if queued and not planner.fits(len(batch), in_flight_images):
+                        # Projected to finish past the deadline: submit nothing more
+                        work_queues.done(device)
+                        not_checked += accumulator.batch_weight(batch)
+                        batches_remaining = False
+                        accumulator.extra_units.clear()
+                        break
+                    future = executor.submit(worker, payload, options)
+                    future_to_batch[future] = batch
+                    in_flight_images += len(batch)
+                    if queued:
+                        future_device[future] = device
+                
+                if not future_to_batch and not accumulator.extra_units:
+                    break
+                
+                done, _ = wait(future_to_batch, timeout=0.5, return_when=FIRST_COMPLETED)
+                
+                # Process results as they complete
+                for future in done:
+                    batch = future_to_batch.pop(future)
+                    if future in future_device:
+                        work_queues.done(future_device.pop(future))
+                    with metrics_lock:
+                        metrics['queue_depth'] -= len(batch)
+                    in_flight_images -= len(batch)
+                    try:
+                        batch_results = future.result()
+                        accumulator.add(batch, batch_results)
+                        planner.observe(batch_results)
+                    except Exception as e:
+                        accumulator.failed(batch, e)
+                        continue
+                    if state_conn is not None:
+                        corrupt_paths = {item['path'] for item in batch_results['corrupt_images']}
+                        record_verified(state_conn, batch, corrupt_paths, file_stats, duplicates)
+                        checked += accumulator.batch_weight(batch)
+                        for path, _, _ in batch:
+                            never_verified.discard(path)
+                            never_verified.difference_update(member[0] for member in duplicates.get(path, ()))
+                
+                # Let the controller adjust the number of active workers
+                if controller and controller.update(processing_status['processed_images']):
+                    processing_status['active_processes'] = controller.workers
+                    processing_status['concurrency_decisions'] = list(controller.decisions)
+                    with metrics_lock:
+                        metrics['active_workers'] = controller.workers
+        
+        # Whatever the budget cut off is reported as not checked
+        not_checked += sum(accumulator.batch_weight(batch) for _, _, batch in work_queues.remaining())
+        
+        with metrics_lock:
+            metrics['active_workers'] = 0
+            metrics['queue_depth'] = 0
+    
+    # Optional manifest of the files that passed, for later checksum-only verification
+    if options.get('write_manifest') and image_tasks:
+        processing_status['current_folder'] = 'Writing manifest'
+        # Only files a worker checked and did not flag; failed or cut-off batches are left out
+        listed = {task[0] for task in image_tasks}
+        passed = [task for task in accumulator.completed
+                  if task[0] in listed and task[0] not in accumulator.corrupt_paths]
+        passed += [member for task in passed for member in duplicates.get(task[0], ())]
+        write_manifest(checksum_tasks(main_folder_path, passed, max_processes))
+    
+    if state_conn is not None:
+        processing_status['coverage'] = {
+            'checked': checked,
+            'eligible': eligible,
+            'fraction': round(checked / eligible, 4) if eligible else 1.0,
+            'never_verified_remaining': len(never_verified),
+            'not_checked': not_checked,
+            'budget_seconds': options['budget_seconds'],
+            'budget_exhausted': checked < eligible,
+        }
+        state_conn.close()
     
     # Save results to file
+    finish_job(accumulator)
+
+def collect_manifest_files(main_folder_path, folder_name):
+    """List (path, folder, filename) and sizes for every regular file under a folder, recursively"""
+    tasks = []
+    sizes = {}
+    for dirpath, _, filenames in os.walk(os.path.join(main_folder_path, folder_name)):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                continue
+            tasks.append((path, folder_name, os.path.relpath(path, os.path.join(main_folder_path, folder_name))))
+    return tasks, sizes
+
+def process_manifest_verification(main_folder_path, folder_names, max_processes, options=None):
+    """Verify the selected folders against a checksum manifest instead of decoding images
+    
+    Sizes recorded in our own manifests rule out mismatches without hashing;
+    everything else is hashed in parallel. Mismatched files are reported as
+    corrupt; missing and extra files get their own report section. Entries are
+    relative to the manifest's own folder (e.g. `sha256sum *` run inside the
+    scanned folder) or, failing that, to the scan root, whichever matches more files.
+    """
+    options = begin_job(folder_names, max_processes, options)
+    accumulator = ScanAccumulator(options)
+    try:
+        entries, algorithm = load_manifest(options['manifest_path'])
+    except (OSError, ValueError) as e:
+        processing_status['message'] = f'Error reading manifest: {str(e)}'
+        end_job()
+        return
+    
+    files = []
+    sizes = {}
+    manifest_path = os.path.abspath(options['manifest_path'])
+    for folder_name in folder_names:
+        processing_status['current_folder'] = folder_name
+        folder_files, folder_sizes = collect_manifest_files(main_folder_path, folder_name)
+        files.extend(task for task in folder_files if os.path.abspath(task[0]) != manifest_path)
+        sizes.update(folder_sizes)
+        processing_status['processed_folders'] += 1
+    processing_status['total_images'] = len(files)
+    processing_status['total_bytes'] = sum(sizes.values())
+    
+    # Base folder the entries are relative to
+    base = main_folder_path
+    base_keys = None
+    for candidate in (os.path.dirname(manifest_path), main_folder_path):
+        candidate_keys = {task[0]: manifest_key(os.path.relpath(task[0], candidate)) for task in files}
+        if base_keys is None or (sum(key in entries for key in candidate_keys.values()) >
+                                 sum(key in entries for key in base_keys.values())):
+            base, base_keys = candidate, candidate_keys
+    processing_status['manifest_base'] = base
+    
+    report = {'algorithm': algorithm, 'verified': 0, 'mismatched': [], 'missing': [], 'extra': [], 'unreadable': []}
+    processing_status['manifest_report'] = report
+    keys = {}
+    to_hash = []
+    for task in files:
+        key = keys[task[0]] = base_keys[task[0]]
+        entry = entries.get(key)
+        if entry is None:
+            report['extra'].append({'folder': task[1], 'path': key})
+            if options.get('write_manifest'):
+                to_hash.append(task)  # Hashed only so the new manifest includes it
+            else:
+                accumulator.advance(1, sizes[task[0]])
+        elif entry[1] is not None and entry[1] != sizes[task[0]]:
+            report['mismatched'].append({'folder': task[1], 'path': key, 'reason': 'size mismatch'})
+            accumulator.advance(1, sizes[task[0]])
+        else:
+            to_hash.append(task)
+    
+    def hashed(task, digest):
+        entry = entries.get(keys[task[0]])
+        if digest is None:
+            report['unreadable'].append({'folder': task[1], 'path': keys[task[0]]})
+        elif entry is not None:
+            if bytes.fromhex(digest) == entry[0]:
+                report['verified'] += 1
+            else:
+                report['mismatched'].append({'folder': task[1], 'path': keys[task[0]], 'reason': 'checksum mismatch'})
+        accumulator.advance(1, sizes[task[0]])
+    
+    processing_status['current_folder'] = f'Hashing ({algorithm})'
+    rows = checksum_tasks(main_folder_path, to_hash, max_processes, algorithm, hashed)
+    
+    # Manifest entries under the selected folders that are no longer on disk
+    on_disk = set(keys.values())
+    folder_paths = {folder_name: os.path.join(os.path.abspath(main_folder_path), folder_name, '')
+                    for folder_name in folder_names}
+    for key in entries:
+        if key in on_disk:
+            continue
+        path = os.path.join(os.path.abspath(base), os.path.normpath(key))
+        for folder_name, folder_path in folder_paths.items():
+            if path.startswith(folder_path):
+                report['missing'].append({'folder': folder_name, 'path': key})
+                break
+    report['missing'].sort(key=lambda item: item['path'])
+    
+    for item in report['mismatched']:
+        path = os.path.join(base, os.path.normpath(item['path']))
+        processing_status['corrupt_images'].append({
+            'folder': item['folder'], 'image': os.path.relpath(path, os.path.join(main_folder_path, item['folder'])),
+            'path': path, 'reason': item['reason'],
+        })
+    
+    # Optional refreshed manifest: verified files plus extras, without the mismatches
+    if options.get('write_manifest'):
+        # Our manifests are always relative to the scan root
+        mismatched = {manifest_key(os.path.relpath(os.path.join(base, item['path']), main_folder_path))
+                      for item in report['mismatched']}
+        write_manifest([row for row in rows if row[0] not in mismatched], algorithm)
+    
+    finish_job(accumulator)
+
+def wilson_interval(corrupt, sampled, population, confidence):
+    """Wilson score interval for a corruption rate, with finite population correction
+    
+    Returns (estimate, low, high).
+    """
+    if sampled == 0:
+        return 0.0, 0.0, 1.0
+    p = corrupt / sampled
+    if sampled >= population:
+        return p, p, p  # Every file was checked, the rate is exact
+    # Finite population correction via the effective sample size, so the
+    # interval collapses onto the observed rate as the sample nears the population
+    n = sampled * (population - 1) / (population - sampled) if population > 1 else sampled
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return p, max(0.0, center - half_width), min(1.0, center + half_width)
+
+def required_sample_size(rate, margin, confidence, population):
+    """Sample size needed for a +/- margin estimate of rate in a finite population"""
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    # Never plan around a zero rate, which would claim certainty from few samples
+    rate = min(max(rate, 0.01), 0.5)
+    n0 = z * z * rate * (1 - rate) / (margin * margin)
+    return math.ceil(n0 / (1 + (n0 - 1) / population))
+
+class FolderSample:
+    """Stratified random sample of one folder's images for a corruption estimate"""
+
+    def __init__(self, folder_name, image_tasks):
+        self.folder_name = folder_name
+        self.population = len(image_tasks)
+        self.sampled = 0
+        self.corrupt = 0
+        self.planned = 0
+        self.escalated = False
+        self.done = self.population == 0
+        
+        # Strata are (extension, size bucket); each is shuffled once and drawn in order
+        strata = {}
+        for task in image_tasks:
+            try:
+                bucket = size_bucket_label(os.path.getsize(task[0]))
+            except OSError:
+                bucket = 'unreadable'
+            key = (os.path.splitext(task[2])[1].lower(), bucket)
+            strata.setdefault(key, []).append(task)
+        self.strata = list(strata.values())
+        for stratum in self.strata:
+            random.shuffle(stratum)
+        self.drawn = [0] * len(self.strata)
+
+    def draw(self, target):
+        """Draw more tasks so the cumulative sample reaches `target`, allocated proportionally"""
+        target = min(target, self.population)
+        tasks = []
+        for i, stratum in enumerate(self.strata):
+            stratum_target = min(len(stratum), math.ceil(target * len(stratum) / self.population))
+            tasks.extend(stratum[self.drawn[i]:stratum_target])
+            self.drawn[i] = max(self.drawn[i], stratum_target)
+        self.planned += len(tasks)
+        return tasks
+
+    def remaining(self):
+        """All tasks not drawn yet"""
+        tasks = []
+        for i, stratum in enumerate(self.strata):
+            tasks.extend(stratum[self.drawn[i]:])
+            self.drawn[i] = len(stratum)
+        self.planned += len(tasks)
+        return tasks
+
+    def estimate(self, confidence):
+        """Current estimate for the status API and result file"""
+        rate, low, high = wilson_interval(self.corrupt, self.sampled, self.population, confidence)
+        return {
+            'population': self.population,
+            'sampled': self.sampled,
+            'corrupt_in_sample': self.corrupt,
+            'estimated_rate': round(rate, 4),
+            'ci_low': round(low, 4),
+            'ci_high': round(high, 4),
+            'confidence': confidence,
+            'exact': self.sampled >= self.population,
+            'escalated': self.escalated,
+        }
+
+def run_sample_round(executor, workers, sample_tasks, options, accumulator, samples):
+    """Check one round of sampled tasks and credit the verdicts to their folders"""
+    batch_size = max(5, len(sample_tasks) // (workers * 4))
+    future_to_batch = {
+        executor.submit(process_single_image_batch, batch, options): batch
+        for batch in create_image_batches(sample_tasks, batch_size)
+    }
+    for future in as_completed(future_to_batch):
+        batch = future_to_batch[future]
+        try:
+            batch_results = future.result()
+        except Exception as e:
+            accumulator.failed(batch, e)
+            continue
+        for task in batch:
+            samples[task[1]].sampled += 1
+        for item in batch_results['corrupt_images']:
+            samples[item['folder']].corrupt += 1
+        accumulator.add(batch, batch_results)
+
+def process_folders_sampled(main_folder_path, folder_names, max_processes, options=None):
+    """Estimate per-folder corruption rates from stratified random samples"""
+    options = begin_job(folder_names, max_processes, options)
+    confidence = options.get('confidence', 0.95)
+    margin = options.get('margin', 0.02)
+    min_sample = options.get('min_sample', 50)
+    escalate_threshold = options.get('escalate_threshold')
+    
+    # Enumerate each folder once; sampling draws from these lists
+    samples = {}
+    for folder_name in folder_names:
+        processing_status['current_folder'] = folder_name
+        folder_tasks = collect_folder_images(main_folder_path, folder_name)
+        if folder_tasks is not None:
+            samples[folder_name] = FolderSample(folder_name, folder_tasks)
+    
+    accumulator = ScanAccumulator(options, history=start_history(main_folder_path, folder_names, options))
+    population = sum(sample.population for sample in samples.values())
+    processing_status['total_images'] = 0
+    
+    if population:
+        workers = max(1, min(max_processes, population))
+        processing_status['active_processes'] = workers
+        with create_executor(options, workers) as executor:
+            # Sequential rounds: grow each folder's sample until its CI is narrow enough
+            while True:
+                round_tasks = []
+                for sample in samples.values():
+                    if sample.done:
+                        continue
+                    if sample.sampled == 0:
+                        target = min_sample
+                    else:
+                        rate, low, high = wilson_interval(sample.corrupt, sample.sampled, sample.population, confidence)
+                        if (high - low) / 2 <= margin or sample.sampled >= sample.population:
+                            sample.done = True
+                            processing_status['processed_folders'] += 1
+                            continue
+                        needed = required_sample_size(rate, margin, confidence, sample.population)
+                        target = max(needed, math.ceil(sample.sampled * 1.25))
+                    round_tasks.extend(sample.draw(target))
+                processing_status['sample_estimates'] = {
+                    name: sample.estimate(confidence) for name, sample in samples.items()
+                }
+                if not round_tasks:
+                    break
+                processing_status['total_images'] += len(round_tasks)
+                processing_status['current_folder'] = f'Sampling {len(round_tasks)} images'
+                run_sample_round(executor, workers, round_tasks, options, accumulator, samples)
+            
+            # Optionally escalate folders over the threshold to a full scan
+            if escalate_threshold is not None:
+                escalate_tasks = []
+                for sample in samples.values():
+                    rate = sample.corrupt / sample.sampled if sample.sampled else 0.0
+                    if rate > escalate_threshold and sample.sampled < sample.population:
+                        sample.escalated = True
+                        escalate_tasks.extend(sample.remaining())
+                if escalate_tasks:
+                    processing_status['total_images'] += len(escalate_tasks)
+                    processing_status['current_folder'] = f'Full scan of {len(escalate_tasks)} images in escalated folders'
+                    run_sample_round(executor, workers, escalate_tasks, options, accumulator, samples)
+                    processing_status['sample_estimates'] = {
+                        name: sample.estimate(confidence) for name, sample in samples.items()
+                    }
+    
+    processing_status['processed_folders'] = len(folder_names)
+    finish_job(accumulator)
+
+# Distributed mode: the coordinator hands out folder leases to agents over HTTP
+coordinator_lock = threading.Lock()
+distributed_job = {
+    'leases': {},
+    'pending': deque(),
+    'verdicts': {},
+    'agents': {},
+    'lease_seconds': 60,
+    'options': {},
+}
+
+# Options that only mean something to the coordinator's own run; the rest go to agents
+COORDINATOR_ONLY_OPTIONS = {
+    'mode', 'manifest_path', 'write_manifest', 'budget_seconds', 'prioritize', 'size_prefilter',
+    'profile', 'profile_seconds', 'profile_until', 'record_history', 'auto_concurrency',
+    'device_aware', 'device_processes',
+}
+
+def start_distributed_job(main_folder_path, folder_names, shard_size, lease_seconds, options):
+    """Split the folder list into leases and wait for agents to pull them"""
+    options = begin_job(folder_names, 0, options)
+    processing_status['total_images'] = count_images_in_folders(main_folder_path, folder_names)
+    processing_status['current_folder'] = 'Waiting for agents'
+    processing_status['agents'] = {}
+    processing_status['leases'] = {}
+    
+    with coordinator_lock:
+        distributed_job['leases'] = {}
+        distributed_job['pending'] = deque()
+        distributed_job['verdicts'] = {}
+        distributed_job['agents'] = {}
+        distributed_job['lease_seconds'] = lease_seconds
+        distributed_job['folder_path'] = main_folder_path
+        distributed_job['folder_names'] = folder_names
+        distributed_job['record_history'] = options.get('record_history', False)
+        # Agents check with the job's own settings; per-image reports stay on the agent
+        distributed_job['options'] = {key: value for key, value in options.items() if key not in COORDINATOR_ONLY_OPTIONS}
+        distributed_job['options']['slowest_limit'] = 0
+        for i in range(0, len(folder_names), shard_size):
+            lease_id = uuid.uuid4().hex[:12]
+            distributed_job['leases'][lease_id] = {
+                'id': lease_id,
+                'folder_path': main_folder_path,
+                'folder_names': folder_names[i:i + shard_size],
+                'state': 'pending',
+                'agent': None,
+                'token': None,
+                'expires_at': None,
+                'processed': 0,
+                'attempts': 0,
+            }
+            distributed_job['pending'].append(lease_id)
+        update_distributed_status()
+
+def expire_leases():
+    """Return leases whose agent stopped responding to the pending queue (call with the lock held)"""
+    now = time.time()
+    for lease in distributed_job['leases'].values():
+        if lease['state'] == 'active' and lease['expires_at'] < now:
+            print(f"Lease {lease['id']} held by {lease['agent']} expired, reassigning")
+            agent = distributed_job['agents'].get(lease['agent'])
+            if agent is not None and agent.get('current_lease') == lease['id']:
+                agent['current_lease'] = None
+            lease['state'] = 'pending'
+            lease['agent'] = None
+            lease['token'] = None
+            lease['processed'] = 0  # The next holder re-checks the whole shard
+            distributed_job['pending'].appendleft(lease['id'])
+
+def update_distributed_status():
+    """Mirror the lease table into processing_status (call with the lock held)"""
+    leases = distributed_job['leases'].values()
+    states = {'pending': 0, 'active': 0, 'done': 0}
+    for lease in leases:
+        states[lease['state']] += 1
+    states['reassigned'] = sum(max(0, lease['attempts'] - 1) for lease in leases)
+    processing_status['leases'] = states
+    processing_status['agents'] = {
+        agent_id: dict(info) for agent_id, info in distributed_job['agents'].items()
+    }
+    processed = sum(lease['processed'] for lease in leases)
+    if processed > processing_status['processed_images']:
+        # Agents report image counts only, so the live rate and ETA are per image here
+        throughput.add(processed - processing_status['processed_images'], 0)
+    processing_status['processed_images'] = processed
+    processing_status['processed_folders'] = sum(
+        len(lease['folder_names']) for lease in leases if lease['state'] == 'done')
+    processing_status['corrupt_images'] = list(distributed_job['verdicts'].values())
+    elapsed_time = time.time() - processing_status['start_time']
+    if elapsed_time > 0:
+        processing_status['images_per_second'] = int(processing_status['processed_images'] / elapsed_time)
+    processing_status['active_processes'] = sum(info.get('processes', 0) for info in distributed_job['agents'].values()
+                                                if info.get('current_lease'))
+
+def find_agent_lease(data):
+    """Look up the lease an agent claims to hold; None if it expired or moved on"""
+    lease = distributed_job['leases'].get(data.get('lease_id'))
+    if lease is None or lease['state'] != 'active' or lease['token'] != data.get('token'):
+        return None
+    return lease
+
+def touch_agent(agent_id, **fields):
+    """Record that an agent was seen (call with the lock held)"""
+    info = distributed_job['agents'].setdefault(agent_id, {'leases_completed': 0, 'current_lease': None})
+    info['last_seen'] = datetime.now().strftime('%H:%M:%S')
+    info.update(fields)
+    return info
+
+@app.route('/coordinator/lease', methods=['POST'])
+def coordinator_lease():
+    """Hand the next pending lease to an agent"""
+    data = request.json or {}
+    agent_id = data.get('agent_id')
+    if not agent_id:
+        return jsonify({'error': 'agent_id is required'}), 400
+    
+    with coordinator_lock:
+        expire_leases()
+        touch_agent(agent_id, processes=int(data.get('processes', 0) or 0))
+        if not processing_status.get('is_processing') or processing_status.get('mode') != 'distributed':
+            return jsonify({'lease': None, 'finished': True})
+        if not distributed_job['pending']:
+            update_distributed_status()
+            # Work is still out with other agents; ask again in case a lease expires
+            return jsonify({'lease': None, 'finished': False, 'retry_after': max(1, distributed_job['lease_seconds'] // 4)})
+        
+        lease = distributed_job['leases'][distributed_job['pending'].popleft()]
+        lease['state'] = 'active'
+        lease['agent'] = agent_id
+        lease['token'] = uuid.uuid4().hex
+        lease['expires_at'] = time.time() + distributed_job['lease_seconds']
+        lease['attempts'] += 1
+        touch_agent(agent_id, current_lease=lease['id'])
+        update_distributed_status()
+        return jsonify({'lease': {
+            'lease_id': lease['id'],
+            'token': lease['token'],
+            'folder_path': lease['folder_path'],
+            'folder_names': lease['folder_names'],
+            'lease_seconds': distributed_job['lease_seconds'],
+            'options': distributed_job['options'],
+        }, 'finished': False})
+
+@app.route('/coordinator/heartbeat', methods=['POST'])
+def coordinator_heartbeat():
+    """Extend an agent's lease while it is still working"""
+    data = request.json or {}
+    with coordinator_lock:
+        lease = find_agent_lease(data)
+        if lease is None:
+            return jsonify({'error': 'Lease expired or reassigned'}), 409
+        lease['expires_at'] = time.time() + distributed_job['lease_seconds']
+        touch_agent(lease['agent'])
+    return jsonify({'ok': True})
+
+@app.route('/coordinator/verdicts', methods=['POST'])
+def coordinator_verdicts():
+    """Receive a stream of verdicts for a lease; done=true completes it"""
+    data = request.json or {}
+    with coordinator_lock:
+        lease = find_agent_lease(data)
+        if lease is None:
+            return jsonify({'error': 'Lease expired or reassigned'}), 409
+        lease['expires_at'] = time.time() + distributed_job['lease_seconds']
+        
+        # Keyed by path so a reassigned shard's re-check does not duplicate findings
+        for item in data.get('corrupt_images', []):
+            distributed_job['verdicts'][item['path']] = item
+        lease['processed'] += int(data.get('processed', 0))
+        
+        agent = touch_agent(lease['agent'])
+        if data.get('done'):
+            lease['state'] = 'done'
+            lease['token'] = None
+            agent['current_lease'] = None
+            agent['leases_completed'] += 1
+        update_distributed_status()
+        
+        if all(item['state'] == 'done' for item in distributed_job['leases'].values()):
+            finish_distributed_job()
+    return jsonify({'ok': True})
+
+def finish_distributed_job():
+    """Write the merged result file once every lease is done (call with the lock held)"""
+    processing_status['current_folder'] = ''
+    processing_status['processed_folders'] = processing_status['total_folders']
+    processing_status['max_processes'] = sum(info.get('processes', 0) for info in distributed_job['agents'].values())
     save_results()
-    processing_status['is_processing'] = False
+    
+    # Agents report corrupt verdicts only, so that is all the history gets for this run
+    history = start_history(distributed_job['folder_path'], distributed_job['folder_names'], {'record_history': distributed_job['record_history'], 'mode': 'distributed'})
+    if history is not None:
+        now = time.time()
+        history.add([(item['path'], item['folder'], item['image'], 1, item.get('reason'), now)
+                     for item in processing_status['corrupt_images']])
+        history.close()
+    end_job()
+
+def agent_request(coordinator_url, endpoint, payload):
+    """POST JSON to the coordinator; returns (status_code, body)"""
+    req = urllib.request.Request(
+        coordinator_url.rstrip('/') + endpoint,
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, json.loads(response.read() or b'{}')
+    except urllib.error.HTTPError as e:
+        return e.code, {}
+
+def run_agent_lease(coordinator_url, lease, processes, root=None):
+    """Check one leased shard locally, streaming verdicts back per batch
+    
+    Returns False if the coordinator took the lease away part-way through.
+    """
+    global io_throttle
+    folder_path = root or lease['folder_path']
+    ident = {'lease_id': lease['lease_id'], 'token': lease['token']}
+    options = lease['options']
+    
+    image_tasks = []
+    for folder_name in lease['folder_names']:
+        image_tasks.extend(collect_folder_images(folder_path, folder_name) or [])
+    
+    # Dedupe within the shard; a representative's verdict covers its duplicates
+    duplicates = {}
+    if options.get('dedupe') and image_tasks:
+        image_tasks, duplicates = group_duplicate_images(image_tasks, processes)
+    io_throttle = IOThrottle(options.get('max_mb_per_second', 0) * 1024 * 1024, options.get('max_opens_per_second', 0))
+    
+    # Heartbeats keep the lease alive through slow batches
+    stop_heartbeat = threading.Event()
+    lost = threading.Event()
+    def heartbeat():
+        while not stop_heartbeat.wait(max(1, lease['lease_seconds'] / 3)):
+            try:
+                status, _ = agent_request(coordinator_url, '/coordinator/heartbeat', ident)
+            except OSError:
+                continue  # Coordinator briefly unreachable; the lease may still survive
+            if status == 409:
+                lost.set()
+                return
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+    
+    try:
+        if image_tasks:
+            workers = max(1, min(processes, len(image_tasks)))
+            batch_size = max(5, len(image_tasks) // (workers * 4))
+            with create_executor(options, workers) as executor:
+                futures = {executor.submit(process_single_image_batch, batch, options): batch
+                           for batch in create_image_batches(image_tasks, batch_size)}
+                for future in as_completed(futures):
+                    if lost.is_set():
+                        for pending in futures:
+                            pending.cancel()
+                        return False
+                    try:
+                        corrupt_images = future.result()['corrupt_images']
+                    except Exception as e:
+                        print(f"Error processing batch: {str(e)}")
+                        corrupt_images = []
+                    batch = futures[future]
+                    corrupt_images += [{'folder': folder, 'image': filename, 'path': path, 'reason': item.get('reason')}
+                                       for item in corrupt_images
+                                       for path, folder, filename in duplicates.get(item['path'], ())]
+                    processed = len(batch) + sum(len(duplicates.get(task[0], ())) for task in batch)
+                    status, _ = agent_request(coordinator_url, '/coordinator/verdicts', dict(
+                        ident, corrupt_images=corrupt_images, processed=processed))
+                    if status == 409:
+                        for pending in futures:
+                            pending.cancel()
+                        return False
+        status, _ = agent_request(coordinator_url, '/coordinator/verdicts', dict(ident, done=True))
+        return status == 200
+    finally:
+        stop_heartbeat.set()
+        io_throttle = None
+
+def run_agent(coordinator_url, processes, agent_id=None, root=None):
+    """Pull leases from a coordinator until its distributed job is finished"""
+    agent_id = agent_id or f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Agent {agent_id} polling {coordinator_url} with {processes} processes")
+    while True:
+        try:
+            status, body = agent_request(coordinator_url, '/coordinator/lease',
+                                         {'agent_id': agent_id, 'processes': processes})
+        except OSError as e:
+            print(f"Coordinator unreachable: {str(e)}")
+            time.sleep(5)
+            continue
+        if status != 200:
+            print(f"Coordinator refused lease request ({status})")
+            time.sleep(5)
+            continue
+        lease = body.get('lease')
+        if lease is None:
+            if body.get('finished'):
+                print("No distributed job running, agent exiting")
+                return
+            time.sleep(body.get('retry_after', 5))
+            continue
+        print(f"Leased {lease['lease_id']}: {', '.join(lease['folder_names'])}")
+        if not run_agent_lease(coordinator_url, lease, processes, root):
+            print(f"Lease {lease['lease_id']} was reassigned, dropping it")
+
+# Watch mode: continuous validation of files arriving under a root folder
+watch_status = {
+    'is_watching': False,
+    'root': '',
+    'backend': '',
+    'pending_files': 0,
+    'in_flight': 0,
+    'checked_images': 0,
+    'corrupt_images': [],
+    'recent_verdicts': [],
+    'latency': {},
+    'message': '',
+}
+watch_stop = threading.Event()
+
+# End-to-end latency buckets (event to verdict) for the watch histogram, in seconds
+WATCH_LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+class InotifyWatcher:
+    """Minimal recursive inotify watcher (Linux) built on ctypes"""
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        self.libc = ctypes.CDLL(libc_name or 'libc.so.6', use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError('inotify is not available on this platform')
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}
+
+    def add_tree(self, root):
+        """Watch root and every directory below it; returns files already present"""
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        existing = []
+        for dirpath, _, filenames in os.walk(root):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dirpath), mask)
+            if wd >= 0:
+                self.watches[wd] = dirpath
+            existing.extend(os.path.join(dirpath, name) for name in filenames)
+        return existing
+
+    def read_events(self, timeout):
+        """Wait up to timeout seconds; returns [(path, is_dir, overflowed)]"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b'\0')
+            offset += name_len
+            if mask & self.IN_Q_OVERFLOW:
+                events.append((None, False, True))
+                continue
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            is_dir = bool(mask & self.IN_ISDIR)
+            # Plain IN_CREATE only matters for directories; files wait for close/move
+            if mask & self.IN_CREATE and not is_dir:
+                continue
+            events.append((os.path.join(directory, os.fsdecode(name)), is_dir, False))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Fallback watcher for platforms without inotify: rescans the tree for changes"""
+
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self.roots = []
+        self.seen = {}
+        self.next_scan = 0
+
+    def _scan(self):
+        changed = []
+        for root in self.roots:
+            for dirpath, _, filenames in os.walk(root):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    signature = (st.st_size, st.st_mtime)
+                    if self.seen.get(path) != signature:
+                        self.seen[path] = signature
+                        changed.append(path)
+        return changed
+
+    def add_tree(self, root):
+        self.roots.append(root)
+        existing = self._scan()
+        self.next_scan = time.time() + self.interval
+        return existing
+
+    def read_events(self, timeout):
+        wait_time = min(timeout, max(0, self.next_scan - time.time()))
+        watch_stop.wait(wait_time)
+        if time.time() < self.next_scan:
+            return []
+        self.next_scan = time.time() + self.interval
+        return [(path, False, False) for path in self._scan()]
+
+    def close(self):
+        pass
+
+def record_watch_latency(seconds):
+    """Add one end-to-end latency to the watch histogram"""
+    with metrics_lock:
+        hist = metrics.setdefault('watch_latency', [0] * len(WATCH_LATENCY_BUCKETS) + [0.0, 0])
+        for i, upper in enumerate(WATCH_LATENCY_BUCKETS):
+            if seconds <= upper:
+                hist[i] += 1
+                break
+        hist[-2] += seconds
+        hist[-1] += 1
+
+def summarize_latencies(latencies):
+    """Mean/percentile summary of recent latencies for the status API"""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        'count': len(ordered),
+        'mean_seconds': round(sum(ordered) / len(ordered), 3),
+        'p50_seconds': round(pick(0.5), 3),
+        'p95_seconds': round(pick(0.95), 3),
+        'max_seconds': round(ordered[-1], 3),
+    }
+
+def watch_folder(root, max_processes, settle_seconds, check_existing):
+    """Debounce new files under root until their size is stable, then check them on a warm pool"""
+    try:
+        watcher = InotifyWatcher()
+        watch_status['backend'] = 'inotify'
+    except OSError:
+        watcher = PollingWatcher()
+        watch_status['backend'] = 'polling'
+    
+    pending = {}  # path -> {'event_time', 'size', 'stable_since'}
+    in_flight = {}  # future -> (path, event_time, ready_time)
+    recent_verdicts = deque(maxlen=200)
+    latencies = deque(maxlen=1000)
+    options = {'slowest_limit': 0}
+    seen = {}  # path -> (size, mtime) when listed at start or last submitted
+    
+    def file_signature(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+    
+    def queue_file(path, now):
+        if os.path.splitext(path)[1].lower() not in IMAGE_EXTENSIONS:
+            return
+        info = pending.get(path)
+        if info is None:
+            pending[path] = {'event_time': now, 'size': None, 'stable_since': now}
+        else:
+            info['stable_since'] = now  # Written again; restart the settle window
+    
+    existing = watcher.add_tree(root)
+    if check_existing:
+        now = time.time()
+        for path in existing:
+            queue_file(path, now)
+    else:
+        seen.update((path, file_signature(path)) for path in existing)
+    
+    try:
+        with ProcessPoolExecutor(max_workers=max_processes) as executor:
+            # Warm the pool so the first verdict does not pay for process start-up
+            for future in [executor.submit(process_single_image_batch, [], options) for _ in range(max_processes)]:
+                future.result()
+            watch_status['message'] = f'Watching {root} with {max_processes} warm processes ({watch_status["backend"]})'
+            
+            while not watch_stop.is_set():
+                now = time.time()
+                # Poll faster while checks are outstanding so verdicts are not delayed
+                timeout = 0.05 if in_flight or pending else 0.25
+                for path, is_dir, overflowed in watcher.read_events(timeout):
+                    if overflowed:
+                        # Events were dropped; rescan and queue only files that changed since last seen
+                        for existing_path in watcher.add_tree(root):
+                            if existing_path not in seen or file_signature(existing_path) != seen[existing_path]:
+                                queue_file(existing_path, now)
+                    elif is_dir:
+                        for existing_path in watcher.add_tree(path):
+                            queue_file(existing_path, now)
+                    else:
+                        queue_file(path, now)
+                
+                # Debounce: submit once the size has not changed for settle_seconds
+                now = time.time()
+                for path, info in list(pending.items()):
+                    try:
+                        size = os.path.getsize(path)
+                    except OSError:
+                        del pending[path]  # Deleted or moved away before it settled
+                        continue
+                    if size != info['size']:
+                        info['size'] = size
+                        info['stable_since'] = now
+                    elif now - info['stable_since'] >= settle_seconds:
+                        del pending[path]
+                        seen[path] = file_signature(path)
+                        task = (path, os.path.relpath(os.path.dirname(path), root), os.path.basename(path))
+                        future = executor.submit(process_single_image_batch, [task], options)
+                        in_flight[future] = (path, info['event_time'], now)
+                
+                # Emit verdicts for finished checks
+                for future in [f for f in in_flight if f.done()]:
+                    path, event_time, ready_time = in_flight.pop(future)
+                    done_time = time.time()
+                    try:
+                        results = future.result()
+                        corrupt = bool(results['corrupt_images'])
+                        merge_batch_stats(results['stats'])
+                    except Exception as e:
+                        print(f"Error checking {path}: {str(e)}")
+                        continue
+                    latency = done_time - event_time
+                    latencies.append(latency)
+                    record_watch_latency(latency)
+                    verdict = {
+                        'path': path,
+                        'corrupt': corrupt,
+                        'time': datetime.now().strftime('%H:%M:%S'),
+                        'latency_seconds': round(latency, 3),
+                        'settle_seconds': round(ready_time - event_time, 3),
+                        'check_seconds': round(done_time - ready_time, 3),
+                    }
+                    recent_verdicts.appendleft(verdict)
+                    watch_status['checked_images'] += 1
+                    if corrupt:
+                        watch_status['corrupt_images'].append(results['corrupt_images'][0])
+                        append_watch_result(results['corrupt_images'][0], verdict)
+                
+                watch_status['pending_files'] = len(pending)
+                watch_status['in_flight'] = len(in_flight)
+                watch_status['recent_verdicts'] = list(recent_verdicts)
+                watch_status['latency'] = summarize_latencies(latencies)
+    finally:
+        watcher.close()
+        watch_status['is_watching'] = False
+    watch_status['message'] = f'Stopped watching {root} after {watch_status["checked_images"]} images'
+
+def append_watch_result(item, verdict):
+    """Append a corrupt verdict from watch mode to the watch result file"""
+    try:
+        file_path = os.path.join(get_results_folder(), 'Watch Corrupt Images.txt')
+        is_new = not os.path.exists(file_path)
+        with open(file_path, 'a', encoding='utf-8') as f:
+            if is_new:
+                f.write("Time\tFolder\tImages\tLatency\n")
+            f.write(f"{datetime.now().isoformat(timespec='seconds')}\t{item['folder']}\t{item['image']}\t{verdict['latency_seconds']}\n")
+        watch_status['result_file'] = file_path
+    except OSError as e:
+        print(f"Error saving watch result: {str(e)}")
 
 def get_desktop_path():
     """Get the desktop path for current user"""
@@ -314,32 +3623,291 @@ def get_unique_filename(folder_path, base_name, extension='.txt'):
     
     return full_path
 
-def save_results():
-    """Save corrupt images list to Desktop in 'Corrupt Image' folder"""
+def get_results_folder():
+    """Get the 'Corrupt Image' folder on the Desktop, creating it if needed"""
+    corrupt_folder = os.path.join(get_desktop_path(), 'Corrupt Image')
+    if not os.path.exists(corrupt_folder):
+        os.makedirs(corrupt_folder)
+    return corrupt_folder
+
+def open_state_db(check_same_thread=True):
+    """Open the local scan state database kept next to the result files"""
+    conn = sqlite3.connect(os.path.join(get_results_folder(), 'scan_history.db'), check_same_thread=check_same_thread)
+    conn.execute('''CREATE TABLE IF NOT EXISTS last_verified (
+        path TEXT PRIMARY KEY,
+        directory TEXT NOT NULL,
+        size INTEGER,
+        mtime REAL,
+        verified_at REAL NOT NULL,
+        corrupt INTEGER NOT NULL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_last_verified_directory ON last_verified (directory)')
+    
+    # Per-run verdict history; WAL lets the query endpoints read while a scan writes
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at REAL NOT NULL,
+        finished_at REAL,
+        mode TEXT NOT NULL,
+        root TEXT NOT NULL,
+        folders TEXT NOT NULL,
+        images INTEGER,
+        corrupt INTEGER,
+        result_file TEXT,
+        complete INTEGER
+    )''')
+    # complete = 1 when every listed file was checked (no budget cut-off, no failed batch);
+    # databases from before the column leave it NULL, so their runs are never diffed by default
+    if 'complete' not in {row[1] for row in conn.execute('PRAGMA table_info(runs)')}:
+        conn.execute('ALTER TABLE runs ADD COLUMN complete INTEGER')
+    conn.execute('''CREATE TABLE IF NOT EXISTS verdicts (
+        run_id INTEGER NOT NULL REFERENCES runs (id),
+        path TEXT NOT NULL,
+        folder TEXT NOT NULL,
+        image TEXT NOT NULL,
+        corrupt INTEGER NOT NULL,
+        reason TEXT,
+        checked_at REAL NOT NULL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_verdicts_path ON verdicts (path, run_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_verdicts_folder ON verdicts (folder, run_id)')
+    # Streams a run in path order; replaces an older idx_verdicts_run on (run_id) alone
+    conn.execute('DROP INDEX IF EXISTS idx_verdicts_run')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_verdicts_run_path ON verdicts (run_id, path)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_verdicts_corrupt ON verdicts (corrupt, run_id)')
+    return conn
+
+class HistoryWriter:
+    """Appends one run's verdicts to the scan history from a background thread
+    
+    The scan loop only queues rows; the writer inserts them HISTORY_BATCH_ROWS
+    at a time, one transaction per batch, so logging never waits on the disk.
+    Verdict rows are (path, folder, image, corrupt, reason, checked_at).
+    """
+
+    def __init__(self, conn, run_id):
+        self.conn = conn
+        self.run_id = run_id
+        self.rows = queue.Queue()
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def add(self, rows):
+        """Queue verdict rows for insertion"""
+        if rows:
+            self.rows.put(rows)
+
+    def _write_loop(self):
+        pending = []
+        while True:
+            try:
+                rows = self.rows.get(timeout=1.0)
+            except queue.Empty:
+                rows = ()  # Idle: flush what has accumulated
+            if rows is None:
+                break
+            pending.extend(rows)
+            if len(pending) >= HISTORY_BATCH_ROWS or (pending and not rows):
+                self._insert(pending)
+                pending = []
+        self._insert(pending)
+
+    def _insert(self, rows):
+        if rows:
+            self.conn.executemany(
+                'INSERT INTO verdicts (run_id, path, folder, image, corrupt, reason, checked_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(self.run_id, *row) for row in rows])
+            self.conn.commit()
+
+    def close(self, complete=False):
+        """Flush the remaining rows and record the run's totals and whether it checked everything"""
+        self.rows.put(None)
+        self.thread.join()
+        self.conn.execute('UPDATE runs SET finished_at = ?, images = ?, corrupt = ?, result_file = ?, complete = ? '
+                          'WHERE id = ?', (
+            time.time(), processing_status['processed_images'], len(processing_status['corrupt_images']),
+            processing_status.get('result_file'), int(complete), self.run_id))
+        self.conn.commit()
+        self.conn.close()
+
+def start_history(main_folder_path, folder_names, options):
+    """Register a run in the scan history and return its writer, or None if disabled"""
+    if not options.get('record_history'):
+        return None
     try:
-        # Get desktop path
-        desktop_path = get_desktop_path()
+        # The writer thread owns the connection from here on
+        conn = open_state_db(check_same_thread=False)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        cursor = conn.execute('INSERT INTO runs (started_at, mode, root, folders) VALUES (?, ?, ?, ?)', (
+            processing_status['start_time'], options.get('mode', 'full'), main_folder_path, '\n'.join(folder_names)))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error opening scan history: {str(e)}")
+        return None
+    processing_status['history_run'] = cursor.lastrowid
+    return HistoryWriter(conn, cursor.lastrowid)
+
+def iter_run_manifest(conn, run_id, root):
+    """Stream (relative_path, folder, corrupt) for one recorded run in path order
+    
+    Paths are made relative to the run's root so runs from before and after a
+    storage migration can be compared; every path shares the root prefix, so
+    the index order on full paths is also the relative order.
+    """
+    prefix = os.path.join(root, '')
+    for path, folder, corrupt in conn.execute(
+            'SELECT path, folder, MAX(corrupt) FROM verdicts WHERE run_id = ? GROUP BY path ORDER BY path', (run_id,)):
+        yield (path[len(prefix):] if path.startswith(prefix) else path), folder, corrupt
+
+def diff_manifests(base_rows, run_rows, folders):
+    """Merge-join two path-sorted manifests, yielding (change, relative_path, folder, corrupt)
+    
+    change is 'newly_corrupt', 'fixed', 'new' or 'deleted'; unchanged files
+    and folders outside `folders` are skipped. Memory use is constant.
+    """
+    base = next(base_rows, None)
+    current = next(run_rows, None)
+    while base is not None or current is not None:
+        if current is None or (base is not None and base[0] < current[0]):
+            if base[1] in folders:
+                yield 'deleted', base[0], base[1], bool(base[2])
+            base = next(base_rows, None)
+        elif base is None or current[0] < base[0]:
+            if current[1] in folders:
+                yield 'new', current[0], current[1], bool(current[2])
+            current = next(run_rows, None)
+        else:
+            if base[2] != current[2] and current[1] in folders:
+                yield ('newly_corrupt' if current[2] else 'fixed'), current[0], current[1], bool(current[2])
+            base = next(base_rows, None)
+            current = next(run_rows, None)
+
+def diff_runs(conn, base_run, run, examples=100):
+    """Compare two recorded runs and write the full diff next to the result files
+    
+    Only folders scanned in both runs are compared. Returns per-folder counts
+    and the first `examples` entries of each kind of change.
+    """
+    base_folders = set(base_run['folders'].split('\n'))
+    run_folders = set(run['folders'].split('\n'))
+    folders = base_folders & run_folders
+    
+    changes = ('newly_corrupt', 'fixed', 'new', 'deleted')
+    per_folder = {}
+    samples = {change: [] for change in changes}
+    report_path = get_unique_filename(get_results_folder(), 'Scan Diff')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write("Folder\tImages\tChange\n")
+        for change, relative_path, folder, corrupt in diff_manifests(
+                iter_run_manifest(conn, base_run['id'], base_run['root']),
+                iter_run_manifest(conn, run['id'], run['root']), folders):
+            image = relative_path[len(folder) + 1:] if relative_path.startswith(folder + os.sep) else relative_path
+            f.write(f"{folder}\t{image}\t{change}{' (corrupt)' if change == 'new' and corrupt else ''}\n")
+            counts = per_folder.setdefault(folder, dict.fromkeys(changes, 0))
+            counts[change] += 1
+            if len(samples[change]) < examples:
+                samples[change].append({'folder': folder, 'path': relative_path, 'corrupt': corrupt})
         
+        # Per-folder summary, separated from the change list by a blank line
+        f.write("\n# Summary\n")
+        f.write("Folder\tNewly Corrupt\tFixed\tNew\tDeleted\n")
+        for folder, counts in sorted(per_folder.items()):
+            f.write(f"{folder}\t{counts['newly_corrupt']}\t{counts['fixed']}\t{counts['new']}\t{counts['deleted']}\n")
+    
+    return {
+        'base_run': base_run['id'],
+        'run': run['id'],
+        'folders': per_folder,
+        'totals': {change: sum(counts[change] for counts in per_folder.values()) for change in changes},
+        'examples': samples,
+        'folders_only_in_base': sorted(base_folders - run_folders),
+        'folders_only_in_run': sorted(run_folders - base_folders),
+        'report_file': report_path,
+    }
+
+def save_results(profile_stats=None):
+    """Save corrupt images list to Desktop in 'Corrupt Image' folder"""
+    try:
         # Create 'Corrupt Image' folder on desktop if it doesn't exist
-        corrupt_folder = os.path.join(desktop_path, 'Corrupt Image')
-        if not os.path.exists(corrupt_folder):
-            os.makedirs(corrupt_folder)
+        corrupt_folder = get_results_folder()
         
         # Get unique filename
         file_path = get_unique_filename(corrupt_folder, 'Corrupt Image')
         
         # Calculate final stats
         total_time = time.time() - processing_status['start_time'] if processing_status['start_time'] else 0
-        final_speed = int(processing_status['total_images'] / total_time) if total_time > 0 else 0
+        final_speed = int(processing_status['processed_images'] / total_time) if total_time > 0 else 0
         
         # Save the file
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write("Folder\tImages\n")  # Header
             for item in processing_status['corrupt_images']:
                 f.write(f"{item['folder']}\t{item['image']}\n")
+            
+            # Budgeted run coverage section
+            if processing_status.get('coverage'):
+                coverage = processing_status['coverage']
+                f.write("\n# Coverage\n")
+                f.write("Checked\tEligible\tFraction\tNot Checked\tNever Verified Remaining\tBudget Exhausted\n")
+                f.write(f"{coverage['checked']}\t{coverage['eligible']}\t{coverage['fraction']:.4f}\t{coverage['not_checked']}\t"
+                        f"{coverage['never_verified_remaining']}\t{'yes' if coverage['budget_exhausted'] else 'no'}\n")
+            
+            # Per-folder sample estimates section
+            if processing_status.get('sample_estimates'):
+                f.write("\n# Sample estimates\n")
+                f.write("Folder\tSampled\tPopulation\tEstimated Rate\tCI Low\tCI High\tEscalated\n")
+                for folder, estimate in processing_status['sample_estimates'].items():
+                    f.write(f"{folder}\t{estimate['sampled']}\t{estimate['population']}\t{estimate['estimated_rate']:.4f}\t"
+                            f"{estimate['ci_low']:.4f}\t{estimate['ci_high']:.4f}\t{'yes' if estimate['escalated'] else 'no'}\n")
+            
+            # Manifest verification section
+            if processing_status.get('manifest_report'):
+                report = processing_status['manifest_report']
+                f.write("\n# Manifest verification\n")
+                f.write("Status\tFolder\tPath\n")
+                for status in ('mismatched', 'missing', 'extra', 'unreadable'):
+                    for item in report[status]:
+                        f.write(f"{status}\t{item['folder']}\t{item['path']}\n")
+            
+            # Size outlier section
+            if processing_status.get('size_outliers'):
+                f.write("\n# Size outliers\n")
+                f.write("Folder\tImages\tBytes\tRobust Z\n")
+                for item in processing_status['size_outliers']:
+                    f.write(f"{item['folder']}\t{item['image']}\t{item['bytes']}\t{item['robust_z']}\n")
+            
+            # Extension/content mismatch section
+            if processing_status['format_mismatches']:
+                f.write("\n# Extension/content mismatches\n")
+                f.write("Folder\tImages\tExtension\tDetected\n")
+                for item in processing_status['format_mismatches']:
+                    f.write(f"{item['folder']}\t{item['image']}\t{item['extension']}\t{item['detected_format']}\n")
+            
+            # Slowest images section, separated from the corrupt list by a blank line
+            if processing_status['slowest_images']:
+                f.write("\n# Slowest images\n")
+                f.write("Seconds\tBytes\tFormat\tDimensions\tPath\n")
+                for item in processing_status['slowest_images']:
+                    dimensions = 'x'.join(str(d) for d in item['dimensions']) if item['dimensions'] else '-'
+                    f.write(f"{item['seconds']:.3f}\t{item['bytes']}\t{item['format']}\t{dimensions}\t{item['path']}\n")
         
         processing_status['result_file'] = file_path
-        processing_status['message'] = f'Processed {processing_status["total_images"]} images in {total_time:.1f}s ({final_speed} images/sec) using {processing_status["max_processes"]} processes. Found {len(processing_status["corrupt_images"])} corrupt images. Results saved to: {file_path}'
+        
+        # Save merged worker profile next to the results
+        if profile_stats is not None:
+            profile_path = os.path.splitext(file_path)[0] + '.pstats'
+            profile_stats.dump_stats(profile_path)
+            processing_status['profile_file'] = profile_path
+        processing_status['message'] = f'Processed {processing_status["processed_images"]} images in {total_time:.1f}s ({final_speed} images/sec) using {processing_status["max_processes"]} processes. Found {len(processing_status["corrupt_images"])} corrupt images. Results saved to: {file_path}'
+        if processing_status.get('manifest_report'):
+            report = processing_status['manifest_report']
+            processing_status['message'] += (f' Manifest: {report["verified"]} verified, {len(report["mismatched"])} mismatched, '
+                                             f'{len(report["missing"])} missing, {len(report["extra"])} extra.')
+        if processing_status.get('manifest_file'):
+            processing_status['message'] += f' Manifest written to: {processing_status["manifest_file"]}'
+        if processing_status.get('multi_frame_images'):
+            processing_status['message'] += f' Checked {processing_status["frames_checked"]} frames across {processing_status["multi_frame_images"]} multi-frame images.'
         
     except Exception as e:
         processing_status['message'] = f'Error saving file: {str(e)}'
@@ -390,18 +3958,639 @@ def start_processing():
     if not folder_names:
         return jsonify({'error': 'Please provide at least one folder name'}), 400
     
+    # Number of slowest images to report
+    options = {}
+    try:
+        options['slowest_limit'] = max(0, int(data.get('slowest_limit', SLOWEST_IMAGES_LIMIT)))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'slowest_limit must be a whole number'}), 400
+    
+    # Auto mode tunes active workers during the run, up to max_processes
+    options['auto_concurrency'] = bool(data.get('auto_concurrency', False))
+    
+    # Optional likely-corrupt-first ordering
+    options['prioritize'] = bool(data.get('prioritize', False))
+    
+    # Optional vectorized size-anomaly prefilter
+    options['size_prefilter'] = bool(data.get('size_prefilter', False))
+    if options['size_prefilter'] and np is None:
+        return jsonify({'error': 'The size prefilter requires NumPy to be installed'}), 400
+    
+    # Optional validation of every frame in animated/multipage images
+    multi_frame = data.get('multi_frame')
+    if multi_frame is True:
+        multi_frame = 'structural'
+    if multi_frame not in (None, False, 'structural', 'decode'):
+        return jsonify({'error': "multi_frame must be true, 'structural' or 'decode'"}), 400
+    options['multi_frame'] = multi_frame or None
+    
+    # Gigapixel images are validated in bounded memory; an optional budget (MB)
+    # limits how much decode memory large images may hold across the pool at once
+    try:
+        options['large_image_pixels'] = max(1_000_000, int(data.get('large_image_pixels', LARGE_IMAGE_PIXELS)))
+        if data.get('memory_budget_mb'):
+            options['memory_budget_mb'] = max(64, int(data['memory_budget_mb']))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'large_image_pixels and memory_budget_mb must be whole numbers'}), 400
+    
+    # Optional device-aware scheduling with per-device in-flight limits ({path on device: limit})
+    options['device_aware'] = bool(data.get('device_aware', False))
+    device_processes = data.get('device_processes') or {}
+    if not isinstance(device_processes, dict):
+        return jsonify({'error': 'device_processes must map a path on each device to a limit'}), 400
+    try:
+        options['device_processes'] = {str(path): max(1, int(limit)) for path, limit in device_processes.items()}
+    except (ValueError, TypeError):
+        return jsonify({'error': 'device_processes limits must be whole numbers'}), 400
+    
+    # Optional I/O limits shared by all workers, and idle CPU/I/O priority for them
+    try:
+        options['max_mb_per_second'] = max(0.0, float(data.get('max_mb_per_second') or 0))
+        options['max_opens_per_second'] = max(0.0, float(data.get('max_opens_per_second') or 0))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'max_mb_per_second and max_opens_per_second must be numbers'}), 400
+    options['low_priority'] = bool(data.get('low_priority', False))
+    
+    # Every run's verdicts go to the scan history database unless disabled
+    options['record_history'] = bool(data.get('record_history', True))
+    
+    # Execution engine: worker processes, threads, or processes each running batch threads
+    options['engine'] = data.get('engine') or 'process'
+    if options['engine'] not in ('process', 'thread', 'hybrid'):
+        return jsonify({'error': "engine must be 'process', 'thread' or 'hybrid'"}), 400
+    if options['engine'] == 'hybrid':
+        try:
+            options['batch_threads'] = max(1, min(64, int(data.get('threads_per_process', 4))))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'threads_per_process must be a whole number'}), 400
+    
+    # Decoder backend: 'pillow', 'auto' (fastest installed per format) or a backend name
+    options['decoder'] = data.get('decoder') or 'pillow'
+    if options['decoder'] != 'auto' and options['decoder'] not in DECODER_BACKENDS:
+        return jsonify({'error': f"decoder must be 'auto' or one of {', '.join(DECODER_BACKENDS)}"}), 400
+    if options['decoder'] != 'auto' and not decoder_available(options['decoder']):
+        return jsonify({'error': f"The {options['decoder']} decoder is not installed"}), 400
+    options['reduced_decode'] = bool(data.get('reduced_decode', False))
+    
+    # Optional scanning of images inside zip/tar archives
+    options['scan_archives'] = bool(data.get('scan_archives', False))
+    
+    # Optional content-hash deduplication
+    options['dedupe'] = bool(data.get('dedupe', False))
+    
+    # Optional worker profiling for the whole job or the first N seconds
+    options['profile'] = bool(data.get('profile', False))
+    profile_seconds = data.get('profile_seconds')
+    if profile_seconds:
+        try:
+            options['profile_seconds'] = max(1, int(profile_seconds))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'profile_seconds must be a whole number of seconds'}), 400
+    
+    # Threads share this process: idle priority would apply to the server itself, and
+    # cProfile cannot profile several threads of one process at once
+    if options['engine'] == 'thread' and options['low_priority']:
+        return jsonify({'error': 'low_priority needs the process or hybrid engine'}), 400
+    if options['engine'] in ('thread', 'hybrid') and options['profile']:
+        return jsonify({'error': 'profile needs the process engine'}), 400
+    
+    # Budgeted mode checks the stalest files first and stops after N seconds
+    if data.get('budget_seconds'):
+        try:
+            options['budget_seconds'] = max(1, int(data['budget_seconds']))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'budget_seconds must be a whole number of seconds'}), 400
+    
+    # Sampling mode estimates corruption rates instead of checking every file
+    mode = data.get('mode', 'full')
+    if mode not in ('full', 'sample', 'distributed', 'manifest'):
+        return jsonify({'error': "mode must be 'full', 'sample', 'distributed' or 'manifest'"}), 400
+    options['mode'] = mode
+    
+    # Manifest mode verifies checksums instead of decoding; any full run can write a manifest
+    options['write_manifest'] = bool(data.get('write_manifest', False))
+    if options['write_manifest'] and mode in ('sample', 'distributed'):
+        return jsonify({'error': 'write_manifest needs a full or manifest run'}), 400
+    if options['scan_archives'] and mode == 'distributed':
+        return jsonify({'error': 'scan_archives is not supported in distributed mode'}), 400
+    if mode == 'manifest':
+        options['manifest_path'] = (data.get('manifest_path') or '').strip()
+        if not os.path.isfile(options['manifest_path']):
+            return jsonify({'error': 'manifest_path must be an existing manifest file'}), 400
+    if mode == 'sample':
+        try:
+            options['confidence'] = float(data.get('confidence', 0.95))
+            options['margin'] = float(data.get('margin', 0.02))
+            options['min_sample'] = max(1, int(data.get('min_sample', 50)))
+            if data.get('escalate_threshold') is not None:
+                options['escalate_threshold'] = float(data['escalate_threshold'])
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid sampling parameters'}), 400
+        if not 0 < options['confidence'] < 1 or not 0 < options['margin'] < 1:
+            return jsonify({'error': 'confidence and margin must be between 0 and 1'}), 400
+    
+    # Distributed mode only creates leases; agents started with `app.py agent` do the work
+    if mode == 'distributed':
+        try:
+            shard_size = max(1, int(data.get('shard_size', 1)))
+            lease_seconds = max(5, int(data.get('lease_seconds', 60)))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'shard_size and lease_seconds must be whole numbers'}), 400
+        start_distributed_job(main_folder_path, folder_names, shard_size, lease_seconds, options)
+        return jsonify({'message': f'Coordinator waiting for agents: {len(distributed_job["leases"])} leases of up to {shard_size} folders'})
+    
     # Start processing in a separate thread
-    thread = threading.Thread(target=process_folders_ultra_fast, args=(main_folder_path, folder_names, max_processes))
+    target = {
+        'sample': process_folders_sampled,
+        'manifest': process_manifest_verification,
+    }.get(mode, process_folders_ultra_fast)
+    thread = threading.Thread(target=target, args=(main_folder_path, folder_names, max_processes, options))
     thread.daemon = True
     thread.start()
     
+    if mode == 'sample':
+        return jsonify({'message': f'Sampling started with {max_processes} processes'})
+    if mode == 'manifest':
+        return jsonify({'message': f'Manifest verification started with {max_processes} hashing threads'})
+    if options['auto_concurrency']:
+        return jsonify({'message': f'Ultra-fast processing started with adaptive concurrency (up to {max_processes} processes)'})
     return jsonify({'message': f'Ultra-fast processing started with {max_processes} processes'})
 
+@app.route('/plan', methods=['POST'])
+def plan():
+    """Dry-run planner: predicted runtimes per process count and check level, before any scan"""
+    data = request.json or {}
+    main_folder_path = data.get('folder_path', '').strip()
+    folder_names = [name.strip() for name in data.get('folder_names', '').split('\n') if name.strip()]
+    if not main_folder_path or not folder_names:
+        return jsonify({'error': 'Please provide both folder path and folder names'}), 400
+    if not os.path.exists(main_folder_path):
+        return jsonify({'error': 'Main folder path does not exist'}), 400
+    if processing_status['is_processing']:
+        # Timings taken next to a running scan would be meaningless
+        return jsonify({'error': 'Processing is already in progress'}), 400
+    try:
+        sample_size = max(1, min(2000, int(data.get('sample_size', 100))))
+        target_seconds = float(data['target_seconds']) if data.get('target_seconds') else None
+    except (ValueError, TypeError):
+        return jsonify({'error': 'sample_size and target_seconds must be numbers'}), 400
+    return jsonify(plan_scan(main_folder_path, folder_names, sample_size, target_seconds))
+
+@app.route('/set_io_limits', methods=['POST'])
+def set_io_limits():
+    """Change the running job's bytes/sec and/or opens/sec limits (0 or null = unlimited)"""
+    data = request.json or {}
+    if not processing_status['is_processing'] or io_throttle is None:
+        return jsonify({'error': 'No job is running'}), 400
+    # Limits left out of the request keep their current value
+    bytes_per_second, opens_per_second = io_throttle.rates[0], io_throttle.rates[1]
+    try:
+        if 'max_mb_per_second' in data:
+            bytes_per_second = max(0.0, float(data['max_mb_per_second'] or 0)) * 1024 * 1024
+        if 'max_opens_per_second' in data:
+            opens_per_second = max(0.0, float(data['max_opens_per_second'] or 0))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'max_mb_per_second and max_opens_per_second must be numbers'}), 400
+    io_throttle.set_rates(bytes_per_second, opens_per_second)
+    processing_status['io_limits'] = io_throttle.limits()
+    return jsonify(processing_status['io_limits'])
+
 @app.route('/get_status')
 def get_status():
+    # compact=1 replaces the result lists with their lengths; /results pages through them instead
+    if throughput is not None:
+        throughput.publish(processing_status)
+    if request.args.get('compact'):
+        status = {key: value for key, value in processing_status.items()
+                  if key not in ('corrupt_images', 'format_mismatches', 'size_outliers')}
+        status['corrupt_count'] = len(processing_status['corrupt_images'])
+        status['result_counts'] = {name: len(result_list(name)) for name in RESULT_LISTS}
+        status['throughput_samples'] = processing_status.get('throughput_samples', [])[-COMPACT_THROUGHPUT_SAMPLES:]
+        if processing_status.get('manifest_report'):
+            status['manifest_report'] = {key: value for key, value in processing_status['manifest_report'].items()
+                                         if not isinstance(value, list)}
+        return jsonify(status)
     return jsonify(processing_status)
 
+# Result lists /results pages through: name -> processing_status key, or manifest report section
+RESULT_LISTS = {
+    'corrupt': 'corrupt_images',
+    'format_mismatches': 'format_mismatches',
+    'size_outliers': 'size_outliers',
+    'manifest_mismatched': 'mismatched',
+    'manifest_missing': 'missing',
+    'manifest_extra': 'extra',
+    'manifest_unreadable': 'unreadable',
+}
+
+def result_list(name):
+    """The current job's list for a RESULT_LISTS name (empty if the job has none)"""
+    if name.startswith('manifest_'):
+        return (processing_status.get('manifest_report') or {}).get(RESULT_LISTS[name], [])
+    return processing_status.get(RESULT_LISTS[name]) or []
+
+RESULT_SORT_KEYS = {
+    'found': None,
+    'folder': lambda item: (item['folder'], result_name(item)),
+    'image': lambda item: result_name(item),
+    'format': lambda item: (result_format(item), item['folder'], result_name(item)),
+    'reason': lambda item: (item.get('reason') or '', item['folder'], result_name(item)),
+}
+
+# Last filtered and sorted view, reused while the panel scrolls through the same list
+results_view = {'key': None, 'order': [], 'folders': {}, 'formats': {}}
+results_view_lock = threading.Lock()
+
+def result_name(item):
+    """Display name of a result row; manifest entries only have their relative path"""
+    return item.get('image') or item['path']
+
+def result_format(item):
+    """File format of a result row, from its extension"""
+    return os.path.splitext(result_name(item))[1].lower().lstrip('.') or 'none'
+
+def result_row(index, item):
+    """A result list entry as sent to the results panel"""
+    return dict(item, index=index, image=result_name(item), format=result_format(item),
+                reason=item.get('reason') or '')
+
+@app.route('/results')
+def results_page():
+    """One page of one of the current job's result lists, sorted and filtered by folder or format
+    
+    list= names the list (see RESULT_LISTS; default the corrupt images).
+    since=N returns the matching rows found after the first N in discovery
+    order, so a live view appends new rows instead of reloading the list.
+    """
+    list_name = request.args.get('list', 'corrupt')
+    if list_name not in RESULT_LISTS:
+        return jsonify({'error': f"list must be one of: {', '.join(RESULT_LISTS)}"}), 400
+    sort = request.args.get('sort', 'found')
+    if sort not in RESULT_SORT_KEYS:
+        return jsonify({'error': f"sort must be one of: {', '.join(RESULT_SORT_KEYS)}"}), 400
+    descending = request.args.get('order') == 'desc'
+    folder = request.args.get('folder') or None
+    file_format = (request.args.get('format') or '').lower() or None
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        since = request.args.get('since')
+        since = max(0, int(since)) if since is not None else None
+    except ValueError:
+        return jsonify({'error': 'offset and since must be integers'}), 400
+    limit = history_query_int('limit', 200, 1000)
+    
+    items = result_list(list_name)
+    count = len(items)
+    
+    def matches(item):
+        return ((folder is None or item['folder'] == folder) and
+                (file_format is None or result_format(item) == file_format))
+    
+    if since is not None:
+        # Facet counts cover only the new rows, for the panel to add to its own
+        folders = {}
+        formats = {}
+        rows = []
+        end = count
+        for index in range(min(since, count), count):
+            item = items[index]
+            if matches(item):
+                if len(rows) == limit:
+                    end = index
+                    break
+                rows.append(result_row(index, item))
+            folders[item['folder']] = folders.get(item['folder'], 0) + 1
+            formats[result_format(item)] = formats.get(result_format(item), 0) + 1
+        return jsonify({'job': processing_status['start_time'], 'count': count, 'rows': rows,
+                        'next_since': end, 'folders': folders, 'formats': formats})
+    
+    # The view only changes when new rows arrive or the sort or filters change
+    key = (processing_status['start_time'], list_name, id(items), count, sort, descending, folder, file_format)
+    with results_view_lock:
+        if results_view['key'] != key:
+            snapshot = items[:count]
+            folders = {}
+            formats = {}
+            order = []
+            for index, item in enumerate(snapshot):
+                folders[item['folder']] = folders.get(item['folder'], 0) + 1
+                formats[result_format(item)] = formats.get(result_format(item), 0) + 1
+                if matches(item):
+                    order.append(index)
+            if RESULT_SORT_KEYS[sort] is not None:
+                order.sort(key=lambda index: RESULT_SORT_KEYS[sort](snapshot[index]))
+            if descending:
+                order.reverse()
+            results_view.update(key=key, order=order, folders=folders, formats=formats)
+        order = results_view['order']
+        folders = results_view['folders']
+        formats = results_view['formats']
+    
+    return jsonify({
+        'job': processing_status['start_time'],
+        'count': count,
+        'total': len(order),
+        'offset': offset,
+        'rows': [result_row(index, items[index]) for index in order[offset:offset + limit]],
+        'folders': folders,
+        'formats': formats,
+    })
+
+@app.route('/start_watch', methods=['POST'])
+def start_watch():
+    """Start continuous validation of images arriving under a folder"""
+    data = request.json or {}
+    root = data.get('folder_path', '').strip()
+    if not root or not os.path.isdir(root):
+        return jsonify({'error': 'Watch folder path does not exist'}), 400
+    if watch_status['is_watching']:
+        return jsonify({'error': 'A watch is already running'}), 400
+    try:
+        max_processes = max(1, min(32, int(data.get('max_processes', multiprocessing.cpu_count()))))
+        settle_seconds = max(0.0, float(data.get('settle_seconds', 2.0)))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'max_processes and settle_seconds must be numbers'}), 400
+    
+    watch_stop.clear()
+    watch_status.update({
+        'is_watching': True, 'root': root, 'pending_files': 0, 'in_flight': 0,
+        'checked_images': 0, 'corrupt_images': [], 'recent_verdicts': [], 'latency': {},
+        'message': f'Starting watch on {root}',
+    })
+    thread = threading.Thread(target=watch_folder, args=(root, max_processes, settle_seconds,
+                                                         bool(data.get('check_existing', False))))
+    thread.daemon = True
+    thread.start()
+    return jsonify({'message': f'Watching {root}'})
+
+@app.route('/stop_watch', methods=['POST'])
+def stop_watch():
+    """Stop watch mode after in-flight checks finish"""
+    if not watch_status['is_watching']:
+        return jsonify({'error': 'No watch is running'}), 400
+    watch_stop.set()
+    return jsonify({'message': 'Stopping watch'})
+
+@app.route('/get_watch_status')
+def get_watch_status():
+    return jsonify(watch_status)
+
+def history_query_int(name, default, maximum):
+    """Read a positive integer query parameter for the history endpoints"""
+    try:
+        return max(1, min(maximum, int(request.args.get(name, default))))
+    except (ValueError, TypeError):
+        return default
+
+@app.route('/history/runs')
+def history_runs():
+    """Most recent runs recorded in the scan history"""
+    limit = history_query_int('limit', 50, 1000)
+    conn = open_state_db()
+    try:
+        rows = conn.execute('SELECT id, started_at, finished_at, mode, root, folders, images, corrupt, result_file, complete '
+                            'FROM runs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+    finally:
+        conn.close()
+    keys = ('id', 'started_at', 'finished_at', 'mode', 'root', 'folders', 'images', 'corrupt', 'result_file', 'complete')
+    runs = [dict(zip(keys, row)) for row in rows]
+    for run in runs:
+        run['folders'] = run['folders'].split('\n')
+    return jsonify({'runs': runs})
+
+@app.route('/history/file')
+def history_file():
+    """Verdict history of one file across runs, and when it went bad"""
+    path = request.args.get('path', '')
+    if not path:
+        return jsonify({'error': 'path is required'}), 400
+    conn = open_state_db()
+    try:
+        # A file checked in several units of one run (e.g. frame ranges) is corrupt if any unit said so
+        rows = conn.execute('SELECT v.run_id, r.started_at, MAX(v.corrupt), MAX(v.reason) FROM verdicts v '
+                            'JOIN runs r ON r.id = v.run_id WHERE v.path = ? GROUP BY v.run_id ORDER BY v.run_id',
+                            (path,)).fetchall()
+    finally:
+        conn.close()
+    
+    verdicts = [{'run_id': run_id, 'started_at': started_at, 'corrupt': bool(corrupt), 'reason': reason}
+                for run_id, started_at, corrupt, reason in rows]
+    # The current corrupt streak starts after the last run that found the file intact
+    went_bad = None
+    for verdict in verdicts:
+        if not verdict['corrupt']:
+            went_bad = None
+        elif went_bad is None:
+            went_bad = verdict
+    return jsonify({
+        'path': path,
+        'verdicts': verdicts,
+        'first_corrupt': next((verdict for verdict in verdicts if verdict['corrupt']), None),
+        'went_bad': went_bad,
+    })
+
+@app.route('/history/folders')
+def history_folders():
+    """Per-folder corruption rates over the last N runs, most degraded first"""
+    runs = history_query_int('runs', 10, 1000)
+    conn = open_state_db()
+    try:
+        rows = conn.execute('SELECT v.run_id, r.root, v.folder, COUNT(DISTINCT v.path), '
+                            'COUNT(DISTINCT CASE WHEN v.corrupt THEN v.path END) FROM verdicts v '
+                            'JOIN runs r ON r.id = v.run_id '
+                            'WHERE v.run_id IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?) '
+                            'GROUP BY v.run_id, r.root, v.folder ORDER BY v.run_id', (runs,)).fetchall()
+    finally:
+        conn.close()
+    
+    folders = {}
+    for run_id, root, folder, checked, corrupt in rows:
+        folders.setdefault((root, folder), []).append({
+            'run_id': run_id, 'checked': checked, 'corrupt': corrupt,
+            'rate': round(corrupt / checked, 6) if checked else 0.0,
+        })
+    report = []
+    for (root, folder), history in folders.items():
+        report.append({
+            'root': root,
+            'folder': folder,
+            'runs': history,
+            'degradation': round(history[-1]['rate'] - history[0]['rate'], 6),
+            'newly_corrupt': history[-1]['corrupt'] - history[0]['corrupt'],
+        })
+    report.sort(key=lambda item: (item['degradation'], item['newly_corrupt']), reverse=True)
+    return jsonify({'folders': report})
+
+@app.route('/history/diff')
+def history_diff():
+    """Newly corrupt, fixed, new and deleted files between two runs (default: the latest two full runs)"""
+    conn = open_state_db()
+    try:
+        keys = ('id', 'mode', 'root', 'folders', 'complete')
+        try:
+            run_id = int(request.args['run']) if request.args.get('run') else None
+            base_id = int(request.args['base']) if request.args.get('base') else None
+        except ValueError:
+            return jsonify({'error': 'run and base must be run ids'}), 400
+        
+        # By default only complete full runs: budgeted runs are stored as 'full' but checked a subset
+        if run_id is None:
+            row = conn.execute("SELECT id, mode, root, folders, complete FROM runs WHERE mode = 'full' AND complete = 1 "
+                               "ORDER BY id DESC LIMIT 1").fetchone()
+        else:
+            row = conn.execute('SELECT id, mode, root, folders, complete FROM runs WHERE id = ?', (run_id,)).fetchone()
+        if row is None:
+            return jsonify({'error': 'Run not found'}), 404
+        run = dict(zip(keys, row))
+        
+        if base_id is None:
+            row = conn.execute("SELECT id, mode, root, folders, complete FROM runs WHERE mode = 'full' AND complete = 1 "
+                               "AND id < ? ORDER BY id DESC LIMIT 1", (run['id'],)).fetchone()
+        else:
+            row = conn.execute('SELECT id, mode, root, folders, complete FROM runs WHERE id = ?', (base_id,)).fetchone()
+        if row is None:
+            return jsonify({'error': 'No earlier run to compare against'}), 404
+        base_run = dict(zip(keys, row))
+        
+        # Sampled runs and distributed runs (corrupt verdicts only) are not complete manifests
+        if run['mode'] != 'full' or base_run['mode'] != 'full':
+            return jsonify({'error': 'Only full runs can be compared'}), 400
+        diff = diff_runs(conn, base_run, run, history_query_int('examples', 100, 10000))
+        # Runs picked explicitly may be partial; their unchecked files show up as deleted or new
+        diff['incomplete_runs'] = [item['id'] for item in (base_run, run) if not item['complete']]
+        return jsonify(diff)
+    finally:
+        conn.close()
+
+@app.route('/history/corrupt')
+def history_corrupt():
+    """Corrupt verdicts of one run (the latest by default), optionally for one folder"""
+    limit = history_query_int('limit', 1000, 100000)
+    run_id = request.args.get('run')
+    if run_id is not None:
+        try:
+            run_id = int(run_id)
+        except ValueError:
+            return jsonify({'error': 'run must be a run id'}), 400
+    conn = open_state_db()
+    try:
+        if run_id is None:
+            run_id = conn.execute('SELECT MAX(id) FROM runs').fetchone()[0]
+        query = 'SELECT DISTINCT path, folder, image, reason FROM verdicts WHERE corrupt = 1 AND run_id = ?'
+        params = [run_id]
+        if request.args.get('folder'):
+            query += ' AND folder = ?'
+            params.append(request.args['folder'])
+        rows = conn.execute(query + ' ORDER BY path LIMIT ?', (*params, limit)).fetchall()
+    finally:
+        conn.close()
+    return jsonify({
+        'run_id': run_id,
+        'corrupt_images': [{'path': path, 'folder': folder, 'image': image, 'reason': reason}
+                           for path, folder, image, reason in rows],
+    })
+
+def prometheus_label(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_prometheus_metrics():
+    """Render the global metrics in Prometheus text exposition format"""
+    lines = []
+    with metrics_lock:
+        lines.append('# HELP corrupt_checker_stage_seconds Time spent in each image check stage.')
+        lines.append('# TYPE corrupt_checker_stage_seconds histogram')
+        for (stage, fmt, bucket), hist in sorted(metrics['stage_histograms'].items()):
+            labels = f'stage="{prometheus_label(stage)}",format="{prometheus_label(fmt)}",size_bucket="{prometheus_label(bucket)}"'
+            cumulative = 0
+            for i, upper in enumerate(LATENCY_BUCKETS):
+                cumulative += hist[i]
+                lines.append(f'corrupt_checker_stage_seconds_bucket{{{labels},le="{upper}"}} {cumulative}')
+            lines.append(f'corrupt_checker_stage_seconds_bucket{{{labels},le="+Inf"}} {hist[-1]}')
+            lines.append(f'corrupt_checker_stage_seconds_sum{{{labels}}} {hist[-2]:.6f}')
+            lines.append(f'corrupt_checker_stage_seconds_count{{{labels}}} {hist[-1]}')
+        
+        watch_hist = metrics.get('watch_latency')
+        if watch_hist:
+            lines.append('# HELP corrupt_checker_watch_latency_seconds Watch mode latency from file event to verdict.')
+            lines.append('# TYPE corrupt_checker_watch_latency_seconds histogram')
+            cumulative = 0
+            for i, upper in enumerate(WATCH_LATENCY_BUCKETS):
+                cumulative += watch_hist[i]
+                lines.append(f'corrupt_checker_watch_latency_seconds_bucket{{le="{upper}"}} {cumulative}')
+            lines.append(f'corrupt_checker_watch_latency_seconds_bucket{{le="+Inf"}} {watch_hist[-1]}')
+            lines.append(f'corrupt_checker_watch_latency_seconds_sum {watch_hist[-2]:.6f}')
+            lines.append(f'corrupt_checker_watch_latency_seconds_count {watch_hist[-1]}')
+        
+        scalars = [
+            ('corrupt_checker_bytes_read_total', 'counter', 'Bytes of image data checked.', metrics['bytes_read']),
+            ('corrupt_checker_images_checked_total', 'counter', 'Images checked by the workers.', metrics['images_checked']),
+            ('corrupt_checker_corrupt_images_total', 'counter', 'Images found to be corrupt.', metrics['corrupt_found']),
+            ('corrupt_checker_queue_depth', 'gauge', 'Images submitted to the pool but not yet checked.', metrics['queue_depth']),
+            ('corrupt_checker_workers', 'gauge', 'Worker processes in the active pool.', metrics['active_workers']),
+            ('corrupt_checker_cache_hits_total', 'counter', 'Verdicts reused from an identical file instead of decoding.', metrics['cache_hits']),
+            ('corrupt_checker_processing', 'gauge', 'Whether a scan is currently running.', int(processing_status['is_processing'])),
+        ]
+    for name, metric_type, help_text, value in scalars:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose worker stage timings and pool gauges for Prometheus"""
+    return render_prometheus_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 if __name__ == '__main__':
     # Optimize for high-performance processing
     multiprocessing.set_start_method('spawn', force=True)
-    app.run(debug=False, port=500, threaded=True)
\ No newline at end of file
+    
+    parser = argparse.ArgumentParser(description='Image Corruption Checker')
+    parser.add_argument('--port', type=int, default=500, help='Port for the web app / coordinator')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Interface to listen on; use 0.0.0.0 so agents on other machines can reach the coordinator')
+    subparsers = parser.add_subparsers(dest='command')
+    agent_parser = subparsers.add_parser('agent', help='Pull scan leases from a coordinator')
+    agent_parser.add_argument('--coordinator', required=True, help='Coordinator URL, e.g. http://host:500 (start the coordinator with --host 0.0.0.0)')
+    agent_parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+    agent_parser.add_argument('--agent-id', help='Name reported to the coordinator (default: host-pid)')
+    agent_parser.add_argument('--root', help='Local mount point of the main folder if it differs from the coordinator')
+    bench_parser = subparsers.add_parser('benchmark', help='Compare decoder backends on a folder of images')
+    bench_parser.add_argument('folder', help='Folder whose images (recursively) form the corpus')
+    bench_parser.add_argument('--backends', help=f"Comma-separated subset of {', '.join(DECODER_BACKENDS)} (default: all installed)")
+    bench_parser.add_argument('--reduced', action='store_true', help='Decode at 1/8 scale where the backend supports it')
+    bench_parser.add_argument('--limit', type=int, help='Use at most this many images')
+    bench_parser.add_argument('--engines', help='Also compare scan engines, e.g. process,thread,hybrid')
+    bench_parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(), help='Workers per engine')
+    bench_parser.add_argument('--threads', type=int, default=4, help='Threads per process for the hybrid engine')
+    bench_parser.add_argument('--decoder', default='pillow', help="Decoder used in the engine comparison ('auto' or a backend)")
+    args = parser.parse_args()
+    
+    if args.command == 'agent':
+        run_agent(args.coordinator, max(1, args.processes), args.agent_id, args.root)
+    elif args.command == 'benchmark':
+        corpus = load_benchmark_corpus(args.folder, args.limit)
+        backends = [name.strip() for name in args.backends.split(',')] if args.backends else None
+        for name in backends or ():
+            if name not in DECODER_BACKENDS or not decoder_available(name):
+                parser.error(f'decoder backend {name!r} is not installed')
+        print(f"{len(corpus)} images, {sum(len(item[2]) for item in corpus) / (1024 * 1024):.1f} MB in memory")
+        print(f"{'Backend':<12}{'Images':>8}{'Seconds':>10}{'Pillow s':>10}{'Speedup':>9}{'Images/s':>10}{'MB/s':>8}{'Corrupt':>9}{'Disagree':>10}")
+        for result in benchmark_decoders(corpus, backends, args.reduced):
+            print(f"{result['backend']:<12}{result['images']:>8}{result['seconds']:>10.3f}{result['pillow_seconds']:>10.3f}"
+                  f"{result['speedup']:>8.2f}x{result['images_per_second']:>10.1f}"
+                  f"{result['mb_per_second']:>8.1f}{result['corrupt']:>9}{result['disagreements']:>10}")
+        
+        if args.engines:
+            engines = [name.strip() for name in args.engines.split(',')]
+            for engine in engines:
+                if engine not in ('process', 'thread', 'hybrid'):
+                    parser.error(f'unknown engine {engine!r}')
+            print()
+            print(f"{'Workload':<22}{'Engine':<9}{'Images':>8}{'Seconds':>10}{'Images/s':>10}{'Corrupt':>9}")
+            for result in benchmark_engines(corpus, engines, max(1, args.processes), max(1, args.threads), args.decoder):
+                print(f"{result['workload']:<22}{result['engine']:<9}{result['images']:>8}{result['seconds']:>10.3f}"
+                      f"{result['images_per_second']:>10.1f}{result['corrupt']:>9}{'  <- fastest' if result['fastest'] else ''}")
+    else:
+        app.run(debug=False, host=args.host, port=args.port, threaded=True)
\ No newline at end of file
@@ -0,0 +1,46 @@
+import os
+import shutil
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app
+
+
+def write_tiff_with_bad_page(path, pages=50, bad_page=40):
+    """Deflate-compressed multipage TIFF whose `bad_page` strip is garbage"""
+    frames = [Image.new('RGB', (64, 64), (i * 3, 0, 0)) for i in range(pages)]
+    frames[0].save(path, save_all=True, append_images=frames[1:], compression='tiff_deflate')
+    with Image.open(path) as img:
+        img.seek(bad_page)
+        offset, count = img.tag_v2[273][0], img.tag_v2[279][0]
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(b'\xff' * count)
+
+
+def test_frame_range_finding_reaches_duplicates(tmp_path):
+    doc = str(tmp_path / 'doc.tiff')
+    copy = str(tmp_path / 'doc_copy.tiff')
+    write_tiff_with_bad_page(doc)
+    shutil.copy(doc, copy)
+
+    options = app.begin_job(['d'], 1, {'dedupe': True, 'multi_frame': 'decode', 'write_manifest': True})
+    options['defer_frames'] = True
+    try:
+        accumulator = app.ScanAccumulator(options, {doc: [(copy, 'd', 'doc_copy.tiff')]})
+        batch = [(doc, 'd', 'doc.tiff')]
+        accumulator.add(batch, app.process_single_image_batch(batch, options))
+        # The bad page is past the first unit, so only a split-off frame range finds it
+        assert not accumulator.corrupt_paths
+        assert accumulator.extra_units
+
+        while accumulator.extra_units:
+            worker, payload, unit_batch = accumulator.extra_units.popleft()
+            accumulator.add(unit_batch, worker(payload, options))
+
+        assert accumulator.corrupt_paths == {doc, copy}
+        assert {item['path'] for item in app.processing_status['corrupt_images']} == {doc, copy}
+    finally:
+        app.end_job()